@@ -0,0 +1,179 @@
+"""
+Latency and throughput benchmarks for the observer bind tool, run against fake_netcon servers.
+
+    python bench_observer.py --hosts 1,5,10,25,50 --slots 10,32,64 --iterations 20
+
+Reports refresh latency (voice_show_mute round-trip on a pooled session), swap-to-applied latency
+(from pressing Swap until every host has acknowledged the new binds) and multi-host send throughput.
+Extra hosts are served on 127.0.0.2, 127.0.0.3, ... with the shared port, as on a real LAN.
+A per-phase breakdown (connect, write, drain, read, parse, ...) from observer_binds.timings follows.
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import tempfile
+import time
+
+import observer_binds
+from fake_netcon import FakeNetconServer
+from observer_binds import (
+    NetconPool, build_bind_map, fetch_players_async, format_timing_summary, normalize_roster, percentile,
+    send_bind_commands_to_hosts_async, stage_halftime_swap, timings,
+)
+
+def summarize(samples):
+    """Returns: dict of mean/p50/p95/max in milliseconds."""
+    return {
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+def default_keys(players):
+    """Gives the first ten slots the usual 1-9,0 keys, like an observer setting up a 5v5."""
+    number_keys = "1234567890"
+    return [number_keys[i] if i < len(number_keys) else '' for i in range(len(players))]
+
+async def start_servers(host_count, port, **server_options):
+    servers = []
+    for index in range(host_count):
+        server = FakeNetconServer(f"127.0.0.{index + 1}", port, **server_options)
+        try:
+            await server.start()
+        except OSError as e:
+            # Not every OS routes the whole 127.0.0.0/8 block to loopback
+            print(f"  could not listen on {server.host}:{port} ({e}); using {len(servers)} host(s)")
+            break
+        servers.append(server)
+    return servers
+
+async def stop_servers(servers):
+    await asyncio.gather(*(server.stop() for server in servers))
+
+async def bench_refresh(slots, iterations, port, server_options):
+    servers = await start_servers(1, port, roster_size=slots, **server_options)
+    pool = NetconPool()
+    try:
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            players, error_message = await fetch_players_async(servers[0].host, port, pool)
+            samples.append(time.perf_counter() - started)
+            if error_message or len(players) != slots:
+                raise RuntimeError(f"refresh returned {len(players)} of {slots} players: {error_message}")
+        return summarize(samples)
+    finally:
+        await pool.close_all()
+        await stop_servers(servers)
+
+async def bench_swap(host_count, slots, iterations, port, server_options):
+    servers = await start_servers(host_count, port, roster_size=slots, **server_options)
+    hosts = [server.host for server in servers]
+    pool = NetconPool()
+    try:
+        players, error_message = await fetch_players_async(hosts[0], port, pool)
+        players = normalize_roster(players)
+        keys = default_keys(players)
+        # Prime every session with the first-half binds, as they would be before halftime
+        await send_bind_commands_to_hosts_async(hosts, port, build_bind_map(players, keys), pool)
+
+        samples = []
+        for _ in range(iterations):
+            # The GUI stages the second-half binds while keys are edited, so only the push is timed
+            staged = stage_halftime_swap(players, keys)
+            keys = staged.swapped_keys
+            started = time.perf_counter()
+            results = await send_bind_commands_to_hosts_async(hosts, port, staged.bind_map, pool)
+            samples.append(time.perf_counter() - started)
+            if not all(success for host, success, error in results):
+                raise RuntimeError(f"swap failed: {results}")
+        return summarize(samples)
+    finally:
+        await pool.close_all()
+        await stop_servers(servers)
+
+async def bench_send_throughput(host_count, slots, iterations, port, server_options):
+    servers = await start_servers(host_count, port, roster_size=slots, **server_options)
+    hosts = [server.host for server in servers]
+    players = [{"name": f"Player {slot}", "slot": slot} for slot in range(1, slots + 1)]
+    bind_map = build_bind_map(players, default_keys(players))
+    pool = NetconPool()
+    try:
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            results = await send_bind_commands_to_hosts_async(hosts, port, bind_map, pool, full_resync=True)
+            samples.append(time.perf_counter() - started)
+            if not all(success for host, success, error in results):
+                raise RuntimeError(f"send failed: {results}")
+        summary = summarize(samples)
+        summary["hosts_per_s"] = len(hosts) / statistics.fmean(samples)
+        summary["hosts"] = len(hosts)
+        return summary
+    finally:
+        await pool.close_all()
+        await stop_servers(servers)
+
+def print_row(label, summary):
+    extra = f"  {summary['hosts_per_s']:8.0f} hosts/s" if "hosts_per_s" in summary else ""
+    print(f"  {label:<28} mean {summary['mean_ms']:7.2f} ms  p50 {summary['p50_ms']:7.2f} ms  "
+          f"p95 {summary['p95_ms']:7.2f} ms  max {summary['max_ms']:7.2f} ms{extra}")
+
+async def run_benchmarks(args):
+    # The local host (127.0.0.1) takes the cfg + exec path, so the fake server reads the same folder
+    server_options = {"latency": args.latency, "split_size": args.split, "cfg_dir": observer_binds.CS2_CFG_PATH}
+    results = {"refresh": {}, "swap": {}, "send": {}}
+
+    print(f"Refresh latency ({args.iterations} iterations)")
+    for slots in args.slots:
+        summary = await bench_refresh(slots, args.iterations, args.port, server_options)
+        results["refresh"][slots] = summary
+        print_row(f"{slots} slots", summary)
+
+    print("Swap-to-applied latency")
+    for host_count in args.hosts:
+        summary = await bench_swap(host_count, 10, args.iterations, args.port, server_options)
+        results["swap"][host_count] = summary
+        print_row(f"{host_count} host(s), 10 slots", summary)
+
+    print("Multi-host full send throughput")
+    for host_count in args.hosts:
+        for slots in args.slots:
+            summary = await bench_send_throughput(host_count, slots, args.iterations, args.port, server_options)
+            results["send"][f"{host_count}x{slots}"] = summary
+            print_row(f"{summary['hosts']} host(s), {slots} slots", summary)
+
+    print("Per-phase breakdown")
+    print(format_timing_summary(timings.summary()))
+    results["phases"] = {" ".join(key): stats for key, stats in timings.summary().items()}
+    return results
+
+def parse_int_list(text):
+    return [int(value) for value in text.split(",") if value.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark refresh, swap and send against fake netcon servers.")
+    parser.add_argument("--hosts", type=parse_int_list, default=[1, 5, 10, 25, 50], help="host counts, e.g. 1,5,10")
+    parser.add_argument("--slots", type=parse_int_list, default=[10, 32, 64], help="roster sizes, e.g. 10,64")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--port", type=int, default=27120, help="port shared by every fake host")
+    parser.add_argument("--latency", type=float, default=0.0, help="per-command server latency in seconds")
+    parser.add_argument("--split", type=int, default=0, help="server reply fragment size in bytes")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Keep the benchmark from writing into a real CS2 cfg folder
+    observer_binds.CS2_CFG_PATH = tempfile.mkdtemp(prefix="observer_bench_cfg_")
+    try:
+        results = asyncio.run(run_benchmarks(args))
+    finally:
+        shutil.rmtree(observer_binds.CS2_CFG_PATH, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
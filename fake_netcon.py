@@ -0,0 +1,230 @@
+"""
+A stand-in for the CS2 netcon port, so refresh and send performance can be measured and
+regression-tested without a live game client.
+
+    python fake_netcon.py --port 2020 --players 10 --latency 0.005 --split 16
+
+It answers 'voice_show_mute' and 'status' with a generated roster, keeps track of 'bind'/'unbind',
+prints 'echo' text back, and runs 'exec' against files in --cfg-dir. Latency, packet splitting
+and dropped connections can be injected to reproduce a busy or flaky observer PC.
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+
+IAC, SB, SE = 255, 250, 240
+WILL, WONT, DO, DONT = 251, 252, 253, 254
+
+def strip_telnet_negotiation(data):
+    """Removes telnet IAC sequences (option negotiation and subnegotiation) from raw client bytes."""
+    if IAC not in data:
+        return data
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != IAC:
+            out.append(byte)
+            i += 1
+            continue
+        command = data[i + 1] if i + 1 < len(data) else None
+        if command == IAC:
+            out.append(IAC)
+            i += 2
+        elif command in (WILL, WONT, DO, DONT):
+            i += 3
+        elif command == SB:
+            end = data.find(bytes((IAC, SE)), i + 2)
+            i = len(data) if end == -1 else end + 2
+        else:
+            i += 2
+    return bytes(out)
+
+def split_console_line(line):
+    """Splits a console line on ';' outside of double quotes, as the CS2 console does."""
+    return [part.strip() for part in re.findall(r'(?:[^;"]|"[^"]*")+', line) if part.strip()]
+
+class FakeNetconServer:
+    """
+    An asyncio TCP server that behaves like the CS2 netcon console for the commands this tool uses.
+
+    latency      seconds to wait before answering each command
+    split_size   if set, replies are written in pieces of this many bytes so reads come back fragmented
+    refuse_rate  fraction (0-1) of new connections that are dropped straight after being accepted
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, roster_size=10, latency=0.0, split_size=0,
+                 refuse_rate=0.0, cfg_dir=None, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.split_size = split_size
+        self.refuse_rate = refuse_rate
+        self.cfg_dir = cfg_dir
+        self.random = random.Random(seed)
+        # Slot index (0-based, as printed by CS2) -> player name
+        self.roster = {index: f"Player {index + 1}" for index in range(roster_size)}
+        self.binds = {}
+        self.connection_count = 0
+        self.command_count = 0
+        self._server = None
+        self._writers = set()
+        self._handlers = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # Port 0 asks the OS for a free port; report the one actually bound
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Connections still open (e.g. mid-latency) are dropped too, so nothing outlives the server
+        for handler in list(self._handlers):
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _handle_client(self, reader, writer):
+        self.connection_count += 1
+        if self.refuse_rate and self.random.random() < self.refuse_rate:
+            writer.transport.abort()
+            return
+
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        buffer = b""
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buffer += strip_telnet_negotiation(data)
+                while b"\n" in buffer:
+                    raw_line, buffer = buffer.split(b"\n", 1)
+                    line = raw_line.decode("utf-8", errors="replace").strip()
+                    for command in split_console_line(line):
+                        reply = self.run_command(command)
+                        if self.latency:
+                            await asyncio.sleep(self.latency)
+                        if reply:
+                            await self._write_reply(writer, reply.encode("utf-8"))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    def broadcast(self, text):
+        """Prints unsolicited console output (like join/leave messages) to every connected client."""
+        for writer in list(self._writers):
+            if not writer.is_closing():
+                writer.write(text.encode("utf-8"))
+
+    def add_player(self, name):
+        """Puts a player in the lowest free slot and announces it like CS2 does. Returns: the slot index."""
+        index = next(i for i in range(len(self.roster) + 1) if i not in self.roster)
+        self.roster[index] = name
+        self.broadcast(f'Client "{name}" connected (127.0.0.1:27005).\n')
+        return index
+
+    def remove_player(self, index):
+        """Removes the player in a slot and announces the disconnect."""
+        name = self.roster.pop(index, None)
+        if name is not None:
+            self.broadcast(f"Dropped {name} from server: Disconnect\n")
+
+    async def _write_reply(self, writer, data):
+        if not self.split_size:
+            writer.write(data)
+            await writer.drain()
+            return
+        for start in range(0, len(data), self.split_size):
+            writer.write(data[start:start + self.split_size])
+            await writer.drain()
+            # Yield so each piece goes out as its own segment
+            await asyncio.sleep(0)
+
+    def run_command(self, command):
+        """Executes one console command and returns the text CS2 would print (possibly empty)."""
+        self.command_count += 1
+        name, _, args = command.partition(" ")
+        args = args.strip()
+
+        if name == "voice_show_mute":
+            return "".join(f"{index:>3} {player}\n" for index, player in sorted(self.roster.items()))
+        if name == "status":
+            lines = ["---------players--------\n", "  id     time ping loss      state   rate adr name\n"]
+            lines.extend(f"{index:>6}    00:42   12    0     active 786432 127.0.0.1:27005 '{player}'\n"
+                         for index, player in sorted(self.roster.items()))
+            lines.append("#end\n")
+            return "".join(lines)
+        if name == "echo":
+            return args.strip('"') + "\n"
+        if name == "bind":
+            parts = re.findall(r'"([^"]*)"|(\S+)', args)
+            values = [quoted or bare for quoted, bare in parts]
+            if len(values) >= 2:
+                self.binds[values[0].lower()] = values[1]
+            return ""
+        if name == "unbind":
+            self.binds.pop(args.strip('"').lower(), None)
+            return ""
+        if name == "exec":
+            return self._exec_cfg(args.strip('"'))
+        if name in ("spec_usenumberkeys_nobinds", "spec_player"):
+            return ""
+        return f"Unknown command '{name}'\n"
+
+    def _exec_cfg(self, cfg_name):
+        if not cfg_name.endswith(".cfg"):
+            cfg_name += ".cfg"
+        path = os.path.join(self.cfg_dir or "", cfg_name)
+        if self.cfg_dir is None or not os.path.isfile(path):
+            return f"exec {cfg_name}: not found\n"
+        output = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("//"):
+                    output.extend(self.run_command(command) for command in split_console_line(line))
+        return "".join(output)
+
+async def _serve(args):
+    server = FakeNetconServer(args.host, args.port, args.players, args.latency, args.split,
+                              args.refuse_rate, args.cfg_dir)
+    await server.start()
+    print(f"Fake netcon listening on {server.host}:{server.port} with {args.players} players. Ctrl+C to stop.")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake CS2 netcon server for testing the observer bind tool.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2020)
+    parser.add_argument("--players", type=int, default=10, help="roster size reported by voice_show_mute")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering each command")
+    parser.add_argument("--split", type=int, default=0, help="write replies in pieces of this many bytes")
+    parser.add_argument("--refuse-rate", type=float, default=0.0, help="fraction of connections to drop on accept")
+    parser.add_argument("--cfg-dir", help="directory 'exec' reads cfg files from")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
-import tkinter as tk
-from tkinter import messagebox
+"""
+Core of Chezpuf's Observer Bind Tool: netcon sessions, bind building, swap and persistence.
+Nothing here imports tkinter, so match-control scripts can drive it directly, or through the
+command line:
+
+    python -m observer_binds fetch|send|swap
+
+Running it without a command opens the GUI (observer_gui.py).
+"""
+import argparse
+import concurrent.futures
 import re
 import os
+import sys
 import time
 import threading
 import asyncio
-import telnetlib3
+import collections
+import contextlib
+import contextvars
+import copy
+import functools
 import json
+import queue
+import tempfile
 
 # --- V V V ---  USER CONFIGURATION - EDIT THIS SECTION --- V V V ---
 
@@ -14,451 +30,1830 @@ import json
 DEFAULT_TELNET_HOST = "127.0.0.1" # Used as default in the hosts list
 DEFAULT_TELNET_PORT = 2020
 
-# Full path to your CS2 'cfg' directory. (Optional for this version, but good to keep)
+# Full path to your CS2 'cfg' directory. Binds for a local CS2 are written here and applied with one 'exec'
 CS2_CFG_PATH = "C:/Program Files (x86)/Steam/steamapps/common/Counter-Strike Global Offensive/game/csgo/cfg"
 
-# File for saving and loading key assignments and settings (IPs/Port)
+# File for saving and loading settings (IPs/Port, active profiles)
 BINDINGS_FILE = "observer_tool_bindings.json"
 
+# SQLite database holding every player's saved bind key, per team and match profile
+ROSTER_DB_FILE = "observer_tool_roster.db"
+
+# JSON-lines file the GUI appends every phase timing to (connect, write, read, save, ...); "" turns it off
+TIMING_LOG_FILE = "observer_tool_timings.jsonl"
+
+# Size in bytes at which TIMING_LOG_FILE is renamed to '<name>.1' (replacing the previous one) and restarted
+TIMING_LOG_MAX_BYTES = 5_000_000
+
+# Whether the background health probes are written to TIMING_LOG_FILE too; they always show in Diagnostics
+TIMING_LOG_PROBES = False
+
+# Maximum number of hosts that receive binds at the same time
+SEND_MAX_CONCURRENCY = 8
+
+# How many of the configured hosts are asked for the roster at once on Refresh; the first full answer is used
+REFRESH_MAX_HOSTS = 3
+
+# Seconds between background reachability checks of every configured host (GUI only)
+HEALTH_PROBE_INTERVAL = 5.0
+
+# Seconds allowed for connecting to, and writing to, each host before it is reported as failed
+HOST_TIMEOUT = 3.0
+
+# How binds are delivered: "auto" writes them to a cfg file in CS2_CFG_PATH and runs a single 'exec'
+# for a local CS2 (falling back to telnet if the folder does not exist); "telnet" always sends them over netcon
+BIND_DELIVERY_MODE = "auto"
+
+# Name of the generated cfg file inside CS2_CFG_PATH
+GENERATED_CFG_NAME = "observer_binds_generated.cfg"
+
+# Cfg file inside CS2_CFG_PATH the GUI writes the staged second-half binds to, so Swap only sends its 'exec'
+HALFTIME_CFG_NAME = "observer_binds_halftime.cfg"
+
+# Seconds between roster checks while watch mode is on (join/leave lines in the console trigger one sooner)
+WATCH_POLL_INTERVAL = 2.0
+
+# Console command the roster is read from: "voice_show_mute" (slot and name) or "status", which on servers
+# that print them also gives each player's user ID and SteamID, so saved keys follow a player across name changes
+ROSTER_SOURCE = "voice_show_mute"
+
+# Swap layout used when none has been picked (see SWAP_LAYOUTS below for the built-in ones)
+DEFAULT_SWAP_LAYOUT = "standard"
+
+# Optional JSON file next to this script with extra swap layouts, e.g. per-event key sets:
+#   {"lan-final": {"groups": [["q", "w", "e", "r", "t"], ["a", "s", "d", "f", "g"]]}}
+SWAP_LAYOUTS_FILE = "observer_tool_layouts.json"
+
 # --- ^ ^ ^ ---  END OF USER CONFIGURATION --- ^ ^ ^ ---
 
-async def fetch_players_async(host, port):
+# Delay before the first reconnect attempt to a dropped host; doubles on each failure up to the maximum
+RECONNECT_BACKOFF_INITIAL = 0.25
+RECONNECT_BACKOFF_MAX = 5.0
+
+# Hosts that share a file system with this tool, so binds can be delivered through CS2_CFG_PATH
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+# Longest console line sent when several commands are joined with ';'
+CONSOLE_LINE_MAX = 480
+
+# Seconds of quiet before queued settings saves are written to disk
+SAVE_DEBOUNCE = 0.5
+
+# Leading clan tags such as "[TAG] ", "(TAG) " or "TAG | ", stripped before matching names. Only a short
+# upper-case tag counts before a '|', so "Bob | TeamX" and "Alice | TeamX" stay different players
+CLAN_TAG_PATTERN = re.compile(r"^\s*(?:[\[\(\{<][^\]\)\}>]{0,16}[\]\)\}>]\s*)+|^\s*[A-Z0-9!#.*-]{1,6}\s*\|\s*(?=\S)")
+
+# Name of the profile used when no team or match profile is selected
+DEFAULT_PROFILE = "default"
+
+ROSTER_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (kind, name)
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    steamid TEXT UNIQUE,
+    display_name TEXT NOT NULL,
+    normalized_name TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_by_normalized_name ON players (normalized_name, last_seen);
+CREATE INDEX IF NOT EXISTS players_by_display_name ON players (display_name, last_seen);
+CREATE TABLE IF NOT EXISTS profile_keys (
+    profile_id INTEGER NOT NULL REFERENCES profiles (id),
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    key TEXT NOT NULL,
+    PRIMARY KEY (profile_id, player_id)
+);
+"""
+
+# CS2's own join and leave messages, so a watched roster is re-read straight away. Anchored to the
+# message format, so roster replies listing a player named e.g. "Dropped Frames" never match
+ROSTER_EVENT_PATTERN = re.compile(r'^\s*(?:Client\s+".*"\s+connected\b|Dropped\s+.+\s+from\s+server\b)')
+
+# Shortest gap between two roster checks triggered by console events
+WATCH_MIN_INTERVAL = 0.25
+
+# Seconds the other hosts get, after the first roster arrives, to answer so their slots can be cross-checked
+REFRESH_AGREEMENT_WINDOW = 0.05
+
+# Consecutive failures after which a host is marked down and skipped by sends until it answers again
+BREAKER_FAILURE_THRESHOLD = 2
+
+# Without a successful probe, a down host is tried again after this many seconds; doubles each time it fails again
+BREAKER_COOLDOWN_INITIAL = 2.0
+BREAKER_COOLDOWN_MAX = 30.0
+
+# Roster lines, per source:
+#   voice_show_mute:      "  3 PlayerName"                                       (0-based slot)
+#   status (CS2):         "     3    00:42   12    0     active 786432 1.2.3.4:27005 'PlayerName'"
+#   status (older games): "# 12 4 \"PlayerName\" STEAM_1:0:1234 00:42 12 0 active 786432"  (user ID, 1-based slot)
+VOICE_SHOW_MUTE_LINE = re.compile(r"^\s*(\d+)\s+(.+)$")
+STATUS_PLAYER_LINE = re.compile(r"^\s*(\d+)\s+.*'(.*)'\s*$")
+STATUS_LEGACY_PLAYER_LINE = re.compile(r'^#\s*(\d+)\s+(\d+)\s+"(.*)"\s+(\S+)')
+
+# Placeholder id CS2 prints in 'status' for connections that do not have a player slot yet
+STATUS_NO_SLOT_ID = 65535
+
+# Samples kept per operation, phase and host for the rolling timing percentiles
+TIMING_WINDOW = 200
+
+# Name of the operation (refresh, send, swap, watch, probe, ...) the running code belongs to; asyncio tasks inherit it
+current_operation = contextvars.ContextVar('current_operation', default=None)
+
+def percentile(samples, fraction):
+    """Returns: the sample at 'fraction' (0-1) of the sorted samples, or 0.0 if there are none."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class PhaseTimings:
     """
-    Connects to CS2, runs 'voice_show_mute', and parses the output.
-    Returns: (list of players, error_message or None)
+    Measures how long each phase (connect, write, drain, read, parse, save, render, ...) of each
+    operation took, per host, keeping the last 'window' samples of each for rolling percentiles.
+    Every measurement is also handed to the registered sinks as a dict, e.g. to a JsonLinesSink.
+    Thread-safe, so the I/O loop, the save threads and the GUI can all record into one instance.
     """
-    players = []
-    output = ""
-    error_message = None
-    try:
-        reader, writer = await telnetlib3.open_connection(
-            host, port, shell=None
-        )
 
-        writer.write("voice_show_mute\n")
+    def __init__(self, window=TIMING_WINDOW):
+        self.window = window
+        self.sinks = []
+        self._samples = {}
+        self._lock = threading.Lock()
 
-        # Loop to read all incoming data until the server stops sending
-        while True:
+    def add_sink(self, sink):
+        """Registers sink(record) to be called with every measurement."""
+        with self._lock:
+            self.sinks = [*self.sinks, sink]
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self.sinks = [other for other in self.sinks if other is not sink]
+
+    @contextlib.contextmanager
+    def operation(self, name, override=False):
+        """Labels everything measured inside (including tasks started inside) as part of 'name', unless already labelled."""
+        if current_operation.get() is not None and not override:
+            yield
+            return
+        token = current_operation.set(name)
+        try:
+            yield
+        finally:
+            current_operation.reset(token)
+
+    @contextlib.contextmanager
+    def measure(self, phase, host=None, operation=None):
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(phase, time.perf_counter() - started, host, operation, ok)
+
+    def record(self, phase, seconds, host=None, operation=None, ok=True):
+        operation = operation or current_operation.get() or "other"
+        record = {"time": time.time(), "operation": operation, "phase": phase, "host": host,
+                  "ms": round(seconds * 1000, 3), "ok": ok}
+        with self._lock:
+            samples = self._samples.get((operation, phase, host))
+            if samples is None:
+                samples = self._samples[(operation, phase, host)] = collections.deque(maxlen=self.window)
+            samples.append(seconds)
+            sinks = self.sinks
+        for sink in sinks:
             try:
-                # Use a short timeout to reliably read all data packets
-                chunk = await asyncio.wait_for(reader.read(4096), timeout=0.2)
+                sink(record)
+            except Exception:
+                pass
+
+    def summary(self, by_host=False):
+        """
+        Returns: {(operation, phase) or (operation, phase, host): {'count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}
+        over the rolling window, sorted by key.
+        """
+        with self._lock:
+            grouped = {}
+            for (operation, phase, host), samples in self._samples.items():
+                key = (operation, phase, host or '') if by_host else (operation, phase)
+                grouped.setdefault(key, []).extend(samples)
+        return {key: {"count": len(samples),
+                      "p50_ms": percentile(samples, 0.50) * 1000,
+                      "p95_ms": percentile(samples, 0.95) * 1000,
+                      "p99_ms": percentile(samples, 0.99) * 1000,
+                      "max_ms": max(samples) * 1000}
+                for key, samples in sorted(grouped.items())}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+def format_timing_summary(summary):
+    """Returns: a PhaseTimings summary as a fixed-width text table."""
+    if not summary:
+        return "No timings recorded yet."
+    lines = [f"{'operation':<10} {'phase':<8} {'host':<16} {'count':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+    for key, stats in summary.items():
+        operation, phase, host = (*key, '')[:3]
+        lines.append(f"{operation:<10} {phase:<8} {host:<16} {stats['count']:>5} {stats['p50_ms']:>8.2f} "
+                     f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+    return '\n'.join(lines)
+
+class JsonLinesSink:
+    """
+    A PhaseTimings sink appending each record to a file as one JSON line, written by a background thread.
+    Once the file reaches 'max_bytes' (0 for no limit) it is renamed to '<path>.1' and a new one started,
+    so at most two files are kept. Records of the operations in 'exclude_operations' are not written.
+    """
+
+    def __init__(self, path, max_bytes=0, exclude_operations=()):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.exclude_operations = frozenset(exclude_operations)
+        # Opened here so a bad path is reported to the caller instead of killing the writer thread
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="timing-log")
+        self._thread.start()
+
+    def __call__(self, record):
+        if record['operation'] not in self.exclude_operations:
+            self._queue.put(record)
+
+    def _run(self):
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                try:
+                    line = json.dumps(record) + '\n'
+                    if self.max_bytes and self._size and self._size + len(line) > self.max_bytes:
+                        self._rotate()
+                    self._file.write(line)
+                    # json.dumps escapes non-ASCII, so characters and bytes are the same count
+                    self._size += len(line)
+                    if self._queue.empty():
+                        self._file.flush()
+                except (OSError, ValueError):
+                    pass
+        finally:
+            self._file.close()
+
+    def _rotate(self):
+        self._file.close()
+        try:
+            os.replace(self.path, self.path + '.1')
+        finally:
+            # Reopened even if the rename failed, so logging carries on in the old file
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._size = self._file.tell()
+
+    def close(self):
+        """Writes the queued records and closes the file."""
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+# Timings for everything this module does; add a sink to export them
+timings = PhaseTimings()
+
+class ConsoleLineBuffer:
+    """
+    Splits console output arriving in arbitrary chunks into complete lines.
+    A line cut across chunks is held as a list of pieces until its newline arrives, so a long
+    reply costs linear time, and only the unfinished line is ever kept in memory.
+    """
+
+    def __init__(self):
+        self._pieces = []
+
+    def feed(self, chunk):
+        """Returns: list of the lines completed by this chunk, without line endings."""
+        if '\n' not in chunk:
+            if chunk:
+                self._pieces.append(chunk)
+            return []
+        lines = chunk.split('\n')
+        if self._pieces:
+            self._pieces.append(lines[0])
+            lines[0] = ''.join(self._pieces)
+        # The last piece has no newline yet; keep it until the rest of the line arrives
+        tail = lines.pop()
+        self._pieces = [tail] if tail else []
+        return [line.rstrip('\r') for line in lines]
+
+    def flush(self):
+        """Returns: the unfinished last line (possibly empty) and clears it."""
+        line = ''.join(self._pieces).rstrip('\r')
+        self._pieces = []
+        return line
+
+class RosterParser:
+    """
+    Builds a roster from 'voice_show_mute' or 'status' output while it streams in.
+    Feed it raw chunks with feed() or finished lines with feed_line(); each returns the players it
+    recognised, and self.players holds every player seen so far, in console order.
+    """
+
+    def __init__(self, source=ROSTER_SOURCE):
+        if source not in ("voice_show_mute", "status"):
+            raise ValueError(f"Unknown roster source '{source}'")
+        self.source = source
+        self.players = []
+        self._lines = ConsoleLineBuffer()
+        # 'status' prints server details before the player table; only lines inside it are players
+        self._in_player_table = False
+
+    def feed(self, chunk):
+        return [player for player in map(self.feed_line, self._lines.feed(chunk)) if player]
+
+    def close(self):
+        """Parses a last line that arrived without a newline. Returns: list of players (at most one)."""
+        player = self.feed_line(self._lines.flush())
+        return [player] if player else []
+
+    def feed_line(self, line):
+        """Returns: the player dict parsed from this line, or None."""
+        player = self._parse_voice_line(line) if self.source == "voice_show_mute" else self._parse_status_line(line)
+        if player:
+            self.players.append(player)
+        return player
+
+    def _parse_voice_line(self, line):
+        match = VOICE_SHOW_MUTE_LINE.match(line)
+        if not match:
+            return None
+        return {"name": match.group(2).strip(), "slot": int(match.group(1)) + 1}
+
+    def _parse_status_line(self, line):
+        stripped = line.strip()
+        if stripped.startswith("---------players"):
+            self._in_player_table = True
+            return None
+        if stripped == "#end":
+            self._in_player_table = False
+            return None
+
+        match = STATUS_LEGACY_PLAYER_LINE.match(line)
+        if match:
+            userid, slot, name, steamid = match.groups()
+            player = {"name": name.strip(), "slot": int(slot), "userid": int(userid)}
+            if steamid.upper().startswith(("STEAM_", "[U:")):
+                player["steamid"] = steamid
+            return player
+
+        match = STATUS_PLAYER_LINE.match(line) if self._in_player_table else None
+        if not match or int(match.group(1)) >= STATUS_NO_SLOT_ID:
+            return None
+        player_id = int(match.group(1))
+        return {"name": match.group(2).strip(), "slot": player_id + 1, "userid": player_id}
+
+class NetconSession:
+    """
+    A long-lived netcon connection to one CS2 host.
+    A background task drains the socket into an inbox so a dropped connection is noticed
+    immediately; the next operation then reconnects, waiting out an exponential backoff first.
+    """
+
+    def __init__(self, host, port, timeout=HOST_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        # Serializes operations so replies from two commands never interleave
+        self.lock = asyncio.Lock()
+        self._inbox = asyncio.Queue()
+        self._reader_task = None
+        self._failed_attempts = 0
+        self._next_attempt_at = 0.0
+        self._marker_count = 0
+        # Bind map (key -> slot) this host last acknowledged; None means unknown, so the next send is a full sync
+        self.applied_binds = None
+        # Serializes bind syncs so each diff is computed against the state the previous one left behind
+        self.bind_lock = asyncio.Lock()
+        # Incremented on every new connection, so a diff computed for one socket is never credited to another
+        self.generation = 0
+        # Callables given every chunk of console output as it arrives, including output nobody requested
+        self.listeners = []
+
+    @property
+    def connected(self):
+        return (self.writer is not None and not self.writer.is_closing()
+                and self._reader_task is not None and not self._reader_task.done())
+
+    async def ensure_connected(self):
+        """Reconnects if the socket has dropped (or was never opened)."""
+        if self.connected:
+            return
+
+        await self.close()
+        backoff_remaining = self._next_attempt_at - time.monotonic()
+        if backoff_remaining > 0:
+            await asyncio.sleep(backoff_remaining)
+
+        # Imported here so tools that never open a socket do not pay for telnetlib3
+        import telnetlib3
+
+        try:
+            with timings.measure('connect', self.host):
+                self.reader, self.writer = await asyncio.wait_for(
+                    telnetlib3.open_connection(self.host, self.port, shell=None), timeout=self.timeout
+                )
+        except Exception:
+            self._failed_attempts += 1
+            backoff = min(RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_INITIAL * 2 ** (self._failed_attempts - 1))
+            self._next_attempt_at = time.monotonic() + backoff
+            raise
+
+        self._failed_attempts = 0
+        self._next_attempt_at = 0.0
+        # A fresh connection may mean a restarted game, so the last-applied binds can no longer be trusted
+        self.generation += 1
+        self.applied_binds = None
+        self._inbox = asyncio.Queue()
+        self._reader_task = asyncio.create_task(self._read_loop(self.reader, self._inbox))
+
+    async def _read_loop(self, reader, inbox):
+        try:
+            while True:
+                chunk = await reader.read(4096)
                 if not chunk:
                     break
-                output += chunk
-            except asyncio.TimeoutError:
+                inbox.put_nowait(chunk)
+                for listener in list(self.listeners):
+                    try:
+                        listener(chunk)
+                    except Exception:
+                        pass
+        except Exception:
+            pass
+        finally:
+            # None tells any waiting reader that the socket is gone
+            inbox.put_nowait(None)
+
+    def _discard_inbox(self):
+        """Drops console output that arrived while nobody was waiting for it."""
+        while not self._inbox.empty():
+            if self._inbox.get_nowait() is None:
+                raise ConnectionResetError(f"Connection to {self.host}:{self.port} was closed by CS2.")
+
+    async def _write_lines(self, lines):
+        with timings.measure('write', self.host):
+            self.writer.write(''.join(line + '\n' for line in lines))
+        with timings.measure('drain', self.host):
+            await asyncio.wait_for(self.writer.drain(), timeout=self.timeout)
+
+    def _next_marker(self):
+        self._marker_count += 1
+        return f"__obt_done_{self._marker_count}_{os.urandom(4).hex()}__"
+
+    async def request(self, commands, timeout=None, on_line=None):
+        """
+        Sends one or more commands followed by a unique 'echo' marker, and returns all console
+        output printed before the marker comes back. Because CS2 runs console commands in order,
+        the marker proves every command before it was processed, so the reply is never cut short.
+        If on_line is given, each output line is handed to it as soon as it arrives instead of
+        being collected, and '' is returned.
+        The whole exchange, including waiting for a request already running on this session and
+        any reconnect, is bounded by 'timeout' seconds.
+        """
+        if isinstance(commands, str):
+            commands = [commands]
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._request(commands, on_line), timeout=timeout)
+
+    async def _request(self, commands, on_line):
+        async with self.lock:
+            try:
+                return await self._request_locked(commands, on_line)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # Timed out or cancelled mid-exchange: a late reply would otherwise leak into the
+                # next request on this socket. Giving up while still waiting for the lock closes nothing.
+                await self.close()
+                raise
+
+    async def _request_locked(self, commands, on_line):
+        marker = self._next_marker()
+        for attempt in range(2):
+            await self.ensure_connected()
+            try:
+                self._discard_inbox()
+                await self._write_lines([*commands, f"echo {marker}"])
                 break
-        
-        writer.close()
-        await writer.wait_closed()
-        
-        # Regex finds the slot number and the player name
-        player_lines = re.findall(r"^\s*(\d+)\s+(.+)$", output, re.MULTILINE)
-
-        for match in player_lines:
-            player_num_str, player_name = match
-            player_num = int(player_num_str)
-            slot = player_num + 1
-            players.append({"name": player_name.strip(), "slot": slot})
-            
+            except (ConnectionError, OSError):
+                # The session went stale between operations; reconnect once and resend
+                await self.close()
+                if attempt:
+                    raise
+        with timings.measure('read', self.host):
+            return await self._read_until_marker(marker, on_line)
+
+    async def _read_until_marker(self, marker, on_line=None):
+        output_lines = []
+        line_buffer = ConsoleLineBuffer()
+        while True:
+            chunk = await self._inbox.get()
+            if chunk is None:
+                raise ConnectionResetError(f"Connection to {self.host}:{self.port} was closed by CS2.")
+
+            for line in line_buffer.feed(chunk):
+                if line.strip() == marker:
+                    return '\n'.join(output_lines)
+                if on_line is None:
+                    output_lines.append(line)
+                else:
+                    on_line(line)
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self.writer is not None:
+            writer, self.writer, self.reader = self.writer, None, None
+            writer.close()
+            try:
+                await asyncio.wait_for(writer.wait_closed(), timeout=self.timeout)
+            except Exception:
+                pass
+
+class NetconPool:
+    """
+    Keeps one NetconSession per (host, port) so refresh, send and swap reuse the same socket.
+    Sessions belong to the event loop that first used them; drive the pool from a single loop.
+    """
+
+    def __init__(self, timeout=HOST_TIMEOUT):
+        self.timeout = timeout
+        self._sessions = {}
+        # cfg file name -> the bind map written to it by stage_bind_cfg_async; cfg_lock keeps a staged
+        # file from being rewritten while a send is exec'ing it
+        self.staged_cfgs = {}
+        self.cfg_lock = asyncio.Lock()
+        # Requests nobody waits for any more, kept referenced until they finish
+        self._detached = set()
+
+    def get(self, host, port):
+        session = self._sessions.get((host, port))
+        if session is None:
+            session = NetconSession(host, port, self.timeout)
+            self._sessions[(host, port)] = session
+        return session
+
+    def detach(self, task):
+        """
+        Lets a request whose answer is no longer needed run to completion (each is bounded by the
+        session timeout) instead of cancelling it, which would close its socket and lose its diff cache.
+        """
+        self._detached.add(task)
+        task.add_done_callback(self._detached.discard)
+
+    async def close_all(self):
+        for task in list(self._detached):
+            task.cancel()
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+
+class HostHealth:
+    """
+    Remembers whether each host answered recently and how fast, and keeps a circuit breaker per host.
+    After BREAKER_FAILURE_THRESHOLD failures in a row a host is 'down': sends skip it instead of
+    waiting for a connect timeout, until a background probe (or, without probing, a trial after the
+    cooldown) succeeds again. Use from the event loop thread only.
+    on_change(host, status) is called with a copy of the host's status after every update.
+    """
+
+    def __init__(self, pool, on_change=None, probe_interval=HEALTH_PROBE_INTERVAL, probe_timeout=HOST_TIMEOUT):
+        self.pool = pool
+        self.on_change = on_change
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        # Hosts and port probed by run(); replaced (not mutated) when the configuration changes
+        self.targets = ([], None)
+        self._hosts = {}
+
+    def _entry(self, host):
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = {"state": "unknown", "rtt": None, "failures": 0, "last_error": None,
+                     "retry_at": 0.0, "cooldown": BREAKER_COOLDOWN_INITIAL}
+            self._hosts[host] = entry
+        return entry
+
+    def status(self, host):
+        """Returns: dict with 'state' ('unknown', 'up' or 'down'), 'rtt' in seconds or None, 'last_error' and 'retry_in'."""
+        entry = self._entry(host)
+        return {"state": entry["state"], "rtt": entry["rtt"], "last_error": entry["last_error"],
+                "retry_in": max(0.0, entry["retry_at"] - time.monotonic()) if entry["state"] == "down" else 0.0}
+
+    def allows(self, host):
+        """False while the host is down and its cooldown has not run out yet."""
+        entry = self._entry(host)
+        return entry["state"] != "down" or time.monotonic() >= entry["retry_at"]
+
+    def rank(self, hosts):
+        """Returns: the hosts that are not down, fastest first; hosts never measured keep their order after those."""
+        allowed = [host for host in hosts if self.allows(host)]
+        return sorted(allowed, key=lambda host: (self._entry(host)["rtt"] is None, self._entry(host)["rtt"] or 0.0))
+
+    def skip_message(self, host):
+        entry = self._entry(host)
+        return f"Skipped {host}: it is not answering ({entry['last_error'] or 'no reply'}). It is retried automatically."
+
+    def record_success(self, host, rtt=None):
+        entry = self._entry(host)
+        entry.update(state="up", failures=0, last_error=None, cooldown=BREAKER_COOLDOWN_INITIAL)
+        if rtt is not None:
+            entry["rtt"] = rtt
+        self._report(host)
+
+    def record_failure(self, host, error_message):
+        entry = self._entry(host)
+        entry["failures"] += 1
+        entry["last_error"] = (error_message or "no reply").splitlines()[0]
+        if entry["failures"] >= BREAKER_FAILURE_THRESHOLD:
+            if entry["state"] == "down":
+                # A trial after the cooldown failed too; wait longer before the next one
+                entry["cooldown"] = min(BREAKER_COOLDOWN_MAX, entry["cooldown"] * 2)
+            entry["state"] = "down"
+            entry["retry_at"] = time.monotonic() + entry["cooldown"]
+        self._report(host)
+
+    def _report(self, host):
+        if self.on_change:
+            self.on_change(host, self.status(host))
+
+    async def probe(self, host, port):
+        """
+        Round-trips an 'echo' on the host's pooled session and records the result.
+        A session already busy is left alone: the request using it records its own result, and a
+        probe queued behind it would only hold up the sends that come next.
+        """
+        session = self.pool.get(host, port)
+        if session.lock.locked():
+            return
+        started = time.perf_counter()
+        try:
+            with timings.operation('probe', override=True):
+                await session.request([], timeout=self.probe_timeout)
+        except Exception as e:
+            self.record_failure(host, str(e) or type(e).__name__)
+        else:
+            self.record_success(host, time.perf_counter() - started)
+
+    async def run(self):
+        """Probes every target host each probe_interval seconds until cancelled."""
+        while True:
+            hosts, port = self.targets
+            if hosts and port is not None:
+                await asyncio.gather(*(self.probe(host, port) for host in hosts))
+            await asyncio.sleep(self.probe_interval)
+
+class BackgroundLoop:
+    """An asyncio event loop running on a daemon thread, so pooled sessions outlive a single button click."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the background loop and blocks the calling thread until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+
+class CommandQueue:
+    """
+    Hands network operations from any thread to a BackgroundLoop, one lane per kind of operation
+    (e.g. 'send', 'refresh', 'watch'). Each lane runs one operation at a time; submitting while
+    one is already waiting replaces it, so a burst of sends only pushes the latest bind state.
+    Different lanes run concurrently and share the loop's pooled sessions.
+    """
+
+    def __init__(self, io_loop):
+        self.io_loop = io_loop
+        # kind -> [waiting (coro_factory, future) or None, running task or None, lane drain task or None]
+        self._lanes = {}
+
+    def submit(self, kind, coro_factory):
+        """
+        Queues coro_factory() to run on the loop once the lane is free. Thread-safe.
+        Returns: concurrent.futures.Future with the coroutine's result; it is cancelled if a newer
+        operation of the same kind supersedes it before it starts, or if cancel() stops it.
+        """
+        future = concurrent.futures.Future()
+        self.io_loop.loop.call_soon_threadsafe(self._enqueue, kind, coro_factory, future)
+        return future
+
+    def cancel(self, kind=None):
+        """Cancels the waiting and running operation of one kind, or of every kind. Thread-safe."""
+        self.io_loop.loop.call_soon_threadsafe(self._cancel, kind)
+
+    def close(self, timeout=HOST_TIMEOUT):
+        """Cancels everything and waits (up to 'timeout') for running operations to unwind."""
+        self.io_loop.run(self._close(), timeout=timeout)
+
+    def _enqueue(self, kind, coro_factory, future):
+        lane = self._lanes.setdefault(kind, [None, None, None])
+        if lane[0] is not None:
+            lane[0][1].cancel()
+        lane[0] = (coro_factory, future)
+        if lane[2] is None:
+            lane[2] = self.io_loop.loop.create_task(self._drain(lane))
+
+    async def _drain(self, lane):
+        try:
+            while lane[0] is not None:
+                (coro_factory, future), lane[0] = lane[0], None
+                if not future.set_running_or_notify_cancel():
+                    continue
+                lane[1] = asyncio.ensure_future(coro_factory())
+                try:
+                    future.set_result(await lane[1])
+                except asyncio.CancelledError:
+                    future.set_exception(concurrent.futures.CancelledError())
+                except Exception as e:
+                    future.set_exception(e)
+                finally:
+                    lane[1] = None
+        finally:
+            lane[2] = None
+
+    def _cancel(self, kind):
+        lanes = self._lanes.values() if kind is None else [self._lanes.get(kind, [None, None, None])]
+        for lane in lanes:
+            if lane[0] is not None:
+                lane[0][1].cancel()
+                lane[0] = None
+            if lane[1] is not None:
+                lane[1].cancel()
+
+    async def _close(self):
+        self._cancel(None)
+        drains = [lane[2] for lane in self._lanes.values() if lane[2] is not None]
+        await asyncio.gather(*drains, return_exceptions=True)
+
+async def fetch_players_async(host, port, pool, source=ROSTER_SOURCE):
+    """
+    Runs the roster command ('voice_show_mute' or 'status') over the pooled session for this host,
+    parsing each line as it arrives, and returns as soon as the complete reply has arrived.
+    Returns: (list of players, error_message or None)
+    """
+    parser = RosterParser(source)
+    error_message = None
+    # Lines are parsed while the reply streams in, so parse time is summed line by line
+    parse_time = 0.0
+
+    def parse_line(line):
+        nonlocal parse_time
+        started = time.perf_counter()
+        parser.feed_line(line)
+        parse_time += time.perf_counter() - started
+
+    try:
+        with timings.operation('refresh'):
+            with timings.measure('total', host):
+                await pool.get(host, port).request(source, on_line=parse_line)
+            timings.record('parse', parse_time, host)
     except ConnectionRefusedError:
         error_message = f"Connection refused on {host}:{port}.\n\nIs CS2 running with '-netconport {port}' in launch options?"
+    except asyncio.TimeoutError:
+        error_message = f"Timed out waiting for {host}:{port} to answer '{source}'."
     except Exception as e:
         error_message = f"An unexpected error occurred during fetch: {e}"
-        
-    return players, error_message
 
-async def send_bind_commands_async(host, port, bind_commands):
+    if error_message:
+        # A partial roster would look like players leaving; report nothing instead
+        return [], error_message
+    return parser.players, None
+
+def build_bind_map(players, keys):
+    """
+    Pairs each player with the key entered for them.
+    Returns: dict of key -> slot for every player that has a key (a key used twice keeps the later player).
+    """
+    bind_map = {}
+    for player, key in zip(players, keys):
+        if key:
+            bind_map[key] = player['slot']
+    return bind_map
+
+def diff_bind_commands(applied_binds, desired_binds):
+    """
+    Builds the console commands that turn 'applied_binds' into 'desired_binds' (both key -> slot).
+    Pass applied_binds=None to get a full resync of every bind.
+    Returns: list of command strings (empty when nothing changed)
+    """
+    if applied_binds is None:
+        # Always start by disabling the default number keys to allow custom binds
+        commands = ['spec_usenumberkeys_nobinds false']
+        applied_binds = {}
+    else:
+        commands = [f'unbind "{key}"' for key in applied_binds if key not in desired_binds]
+
+    for key, slot in desired_binds.items():
+        if applied_binds.get(key) != slot:
+            commands.append(f'bind "{key}" "spec_player {slot}"')
+    return commands
+
+def write_file_atomic(path, text):
+    """Writes text to a temp file next to 'path' and renames it into place, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def render_bind_cfg(bind_commands):
+    """Renders commands as the contents of a CS2 cfg file."""
+    header = "// Generated by Chezpuf's Observer Bind Tool - changes are overwritten on the next send\n"
+    return header + ''.join(command + '\n' for command in bind_commands)
+
+def batch_console_lines(commands, max_length=CONSOLE_LINE_MAX):
+    """Joins commands with ';' into as few console lines as possible without exceeding max_length."""
+    lines = []
+    current = ""
+    for command in commands:
+        if current and len(current) + 1 + len(command) > max_length:
+            lines.append(current)
+            current = command
+        else:
+            current = f"{current};{command}" if current else command
+    if current:
+        lines.append(current)
+    return lines
+
+def uses_cfg_delivery(host, delivery_mode=BIND_DELIVERY_MODE):
+    """True when binds for this host should go through a cfg file in CS2_CFG_PATH and one 'exec'."""
+    return delivery_mode == "auto" and host in LOCAL_HOSTS and os.path.isdir(CS2_CFG_PATH)
+
+async def stage_bind_cfg_async(bind_map, pool, cfg_name=HALFTIME_CFG_NAME):
     """
-    Connects to CS2 and sends a list of command strings directly to a single host.
+    Writes the full bind set for 'bind_map' to cfg_name in CS2_CFG_PATH ahead of time, so a later send
+    of the same map to a local CS2 with staged_cfg=cfg_name only has to 'exec' it.
+    Returns: True if written, False if there is no local cfg folder. Raises OSError if it cannot be written.
+    """
+    if not os.path.isdir(CS2_CFG_PATH):
+        return False
+    lines = ['echo "Applying staged observer binds..."', *diff_bind_commands(None, bind_map),
+             'echo "Staged observer binds applied."']
+    async with pool.cfg_lock:
+        pool.staged_cfgs.pop(cfg_name, None)
+        await asyncio.to_thread(write_file_atomic, os.path.join(CS2_CFG_PATH, cfg_name), render_bind_cfg(lines))
+        pool.staged_cfgs[cfg_name] = dict(bind_map)
+    return True
+
+async def _deliver_bind_commands(session, host, bind_map, applied_binds, bind_commands, pool, timeout,
+                                 delivery_mode, staged_cfg):
+    """Sends one batch of bind commands (or the cfg exec that applies them) and waits for CS2 to process it."""
+    lines = [f"echo \"Sending observer binds to {host}...\""]
+    lines.extend(bind_commands)
+    lines.append(f"echo \"Observer binds successfully applied on {host}.\"")
+
+    cfg_delivery = uses_cfg_delivery(host, delivery_mode)
+    async with pool.cfg_lock if cfg_delivery and staged_cfg else contextlib.nullcontext():
+        if cfg_delivery:
+            removed_keys = [] if applied_binds is None else [key for key in applied_binds if key not in bind_map]
+            unbinds = [f'unbind "{key}"' for key in removed_keys]
+            if staged_cfg and pool.staged_cfgs.get(staged_cfg) == bind_map:
+                # Already on disk, so nothing is rendered or written on the way
+                lines = batch_console_lines([*unbinds, f"exec {os.path.splitext(staged_cfg)[0]}"])
+            else:
+                # The file holds the whole set, so it can also be exec'd by hand after a game restart
+                cfg_lines = [lines[0], *unbinds, *diff_bind_commands(None, bind_map), lines[-1]]
+                cfg_path = os.path.join(CS2_CFG_PATH, GENERATED_CFG_NAME)
+                await asyncio.to_thread(write_file_atomic, cfg_path, render_bind_cfg(cfg_lines))
+                lines = [f"exec {os.path.splitext(GENERATED_CFG_NAME)[0]}"]
+        else:
+            lines = batch_console_lines(lines)
+
+        # request() returns only after CS2 has processed every line
+        await session.request(lines, timeout=timeout)
+
+async def send_bind_commands_async(host, port, bind_map, pool, timeout=HOST_TIMEOUT, full_resync=False,
+                                   delivery_mode=BIND_DELIVERY_MODE, staged_cfg=None):
+    """
+    Brings a single host's binds in line with 'bind_map' (key -> slot) over its pooled session.
+    Only binds that differ from what the host last acknowledged are sent, plus an 'unbind' for
+    each removed key; 'full_resync' ignores that cache and resends everything.
+    A local CS2 gets the full bind set written to GENERATED_CFG_NAME and applied with one 'exec';
+    if 'staged_cfg' names a file stage_bind_cfg_async() already wrote for this exact bind map, only
+    its 'exec' (and any unbinds) is sent. Other hosts get the commands joined with ';' and written in one go.
+    If the session reconnects during a diff, the full set is sent again before success is reported.
+    The exchange with the host (including waiting for a probe or refresh already using the session,
+    any reconnect and the acknowledgement) is bounded by 'timeout' seconds.
     Returns: (success_boolean, error_message or None)
     """
     error_message = None
+    session = pool.get(host, port)
+    async with session.bind_lock:
+        generation = session.generation
+        applied_binds = None if full_resync or not session.connected else session.applied_binds
+        bind_commands = diff_bind_commands(applied_binds, bind_map)
+        if not bind_commands:
+            return True, None
+
+        try:
+            while True:
+                await _deliver_bind_commands(session, host, bind_map, applied_binds, bind_commands, pool,
+                                             timeout, delivery_mode, staged_cfg)
+                if applied_binds is None or session.generation == generation:
+                    break
+                # The session reconnected mid-send, so only a diff reached a possibly restarted game;
+                # send the whole set before reporting success
+                generation, applied_binds = session.generation, None
+                bind_commands = diff_bind_commands(None, bind_map)
+            session.applied_binds = dict(bind_map)
+            return True, None
+
+        except ConnectionRefusedError:
+            error_message = f"Connection refused on {host}:{port}.\n\nIs CS2 running and fully loaded? Binds were not sent."
+        except asyncio.TimeoutError:
+            error_message = f"Timed out after {timeout}s talking to {host}:{port}. Binds may not have been applied."
+        except Exception as e:
+            error_message = f"Failed to send commands to {host}: {e}"
+        except asyncio.CancelledError:
+            session.applied_binds = None
+            raise
+
+        # Some of the commands may have landed; resync everything next time
+        session.applied_binds = None
+        return False, error_message
+
+async def send_bind_commands_to_hosts_async(hosts, port, bind_map, pool, on_result=None,
+                                            max_concurrency=SEND_MAX_CONCURRENCY, timeout=HOST_TIMEOUT,
+                                            full_resync=False, delivery_mode=BIND_DELIVERY_MODE, health=None,
+                                            staged_cfg=None):
+    """
+    Sends the same bind map to every host concurrently on the running event loop.
+    At most 'max_concurrency' hosts are contacted at once, and on_result(host, success, error_message)
+    is called as soon as each host finishes, so one slow or dead host does not hold up the rest.
+    With a HostHealth, hosts that are down fail straight away without being contacted, and
+    every result is recorded in it. 'staged_cfg' is passed on to send_bind_commands_async().
+    Cancelling the send cancels every host still in progress and waits for them to unwind, so their
+    diff caches are reset before the next send starts.
+    Returns: list of (host, success_boolean, error_message or None) in completion order.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def send_one(host):
+        if health is not None and not health.allows(host):
+            return host, False, health.skip_message(host)
+        async with semaphore:
+            with timings.measure('total', host):
+                success, error_message = await send_bind_commands_async(host, port, bind_map, pool, timeout,
+                                                                        full_resync, delivery_mode, staged_cfg)
+        if health is not None:
+            if success:
+                health.record_success(host)
+            else:
+                health.record_failure(host, error_message)
+        return host, success, error_message
+
+    all_results = []
+    with timings.operation('send'):
+        send_tasks = [asyncio.ensure_future(send_one(host)) for host in hosts]
     try:
-        reader, writer = await telnetlib3.open_connection(
-            host, port, shell=None
-        )
-
-        # Send a brief delay command to ensure connection is stable before sending binds
-        writer.write(f"echo \"Sending observer binds to {host}...\n")
-        await asyncio.sleep(0.1) 
-        
-        for command in bind_commands:
-            # Sending the command as a string with a newline
-            writer.write(command + '\n') 
-            
-        # Send the final confirmation command as a string
-        writer.write(f"echo \"Observer binds successfully applied on {host}.\n")
-
-        writer.close()
-        await writer.wait_closed()
-        return True, None
+        for next_finished in asyncio.as_completed(send_tasks):
+            result = await next_finished
+            all_results.append(result)
+            if on_result:
+                on_result(*result)
+    finally:
+        # If the whole send is cancelled, stop the hosts still in progress too
+        for task in send_tasks:
+            task.cancel()
+        await asyncio.gather(*send_tasks, return_exceptions=True)
 
-    except ConnectionRefusedError:
-        error_message = f"Connection refused on {host}:{port}.\n\nIs CS2 running and fully loaded? Binds were not sent."
-    except Exception as e:
-        error_message = f"Failed to send commands to {host}: {e}"
-        
-    return False, error_message
+    return all_results
 
-class ObserverApp:
-    
-    # Terms used to identify users who should be excluded from the Halftime Swap
-    EXCLUSION_TERMS = ["coach", "spectator", "spec", "caster", "admin"]
-    
-    # Fixed key map for the halftime swap (Old Key -> New Key)
-    # The user specifies: 1->6, 2->7, 3->8, 4->9, 5->0, 6->1, 7->2, 8->3, 9->4, 0->5
-    SWAP_KEY_MAP = {
-        '1': '6', '2': '7', '3': '8', '4': '9', '5': '0',
-        '6': '1', '7': '2', '8': '3', '9': '4', '0': '5'
-    }
-
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Chezpuf's Observer Bind Tool")
-        self.root.geometry("500x550") 
-        
-        # self.players holds a unified list of ALL *connected* slots being displayed
-        self.players = [] 
-        # Maps slot number to the index in self.players and self.entry_widgets
-        self.slot_to_index = {} 
-        self.entry_widgets = [] 
-        
-        # Persistent storage
-        self.persistent_data = self._load_data()
-        
-        hosts_str = self.persistent_data.get('hosts', DEFAULT_TELNET_HOST)
-        if 'host' in self.persistent_data and self.persistent_data['host'] != hosts_str:
-            hosts_str = self.persistent_data['host']
-            
-        self.hosts_var = tk.StringVar(value=hosts_str)
-        self.port_var = tk.StringVar(value=self.persistent_data.get('port', DEFAULT_TELNET_PORT))
-        self.persistent_bindings = self.persistent_data.get('bindings', {})
-
-        self.setup_ui()
-        self._save_data()
-
-    def _load_data(self):
-        """Loads persistent data (bindings, hosts, port) from a local JSON file."""
+def diff_rosters(old_players, new_players):
+    """
+    Compares two rosters by player name.
+    Returns: (joined, left, moved) where 'moved' holds (old_player, new_player) pairs whose slot changed
+    """
+    old_by_name = {player['name']: player for player in old_players}
+    new_by_name = {player['name']: player for player in new_players}
+
+    joined = [player for name, player in new_by_name.items() if name not in old_by_name]
+    left = [player for name, player in old_by_name.items() if name not in new_by_name]
+    moved = [(old_by_name[name], player) for name, player in new_by_name.items()
+             if name in old_by_name and old_by_name[name]['slot'] != player['slot']]
+    return joined, left, moved
+
+# Outcome of a multi-host refresh: the roster used, the host it came from, and
+# {host: (joined, left, moved)} for every other host whose roster did not match it
+RosterResult = collections.namedtuple('RosterResult', ['players', 'error_message', 'host', 'disagreements'])
+
+async def fetch_players_from_hosts_async(hosts, port, pool, source=ROSTER_SOURCE, max_hosts=REFRESH_MAX_HOSTS,
+                                         agreement_window=REFRESH_AGREEMENT_WINDOW, health=None):
+    """
+    Asks up to 'max_hosts' hosts for the roster at once and uses the first complete, non-empty one,
+    so a host that is busy (e.g. loading a map) does not hold up the refresh.
+    Hosts that answered within 'agreement_window' seconds after that are compared against the roster
+    used, and any slot differences are reported as disagreements. Hosts still working then are left to
+    finish in the background (see NetconPool.detach) and their rosters ignored.
+    With a HostHealth, hosts that are down are left out (unless every host is) and the fastest go first,
+    and every host's outcome is recorded in it, including late ones.
+    Returns: RosterResult
+    """
+    if health is not None:
+        hosts = health.rank(hosts) or hosts
+    candidates = list(hosts)[:max(1, max_hosts)]
+    with timings.operation('refresh'):
+        tasks = {asyncio.ensure_future(fetch_players_async(host, port, pool, source)): host for host in candidates}
+    pending = set(tasks)
+    rosters = {}
+    errors = []
+    winner = None
+
+    def record_health(task):
+        if health is not None and not task.cancelled():
+            error_message = task.result()[1]
+            if error_message:
+                health.record_failure(tasks[task], error_message)
+            else:
+                health.record_success(tasks[task])
+
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Several hosts can finish together; prefer the one listed first
+            for task in sorted(done, key=lambda task: candidates.index(tasks[task])):
+                players, error_message = task.result()
+                record_health(task)
+                if error_message:
+                    errors.append(error_message)
+                elif players:
+                    rosters[tasks[task]] = normalize_roster(players)
+                    winner = winner or tasks[task]
+
+        if winner is not None and pending and agreement_window > 0:
+            done, pending = await asyncio.wait(pending, timeout=agreement_window)
+            for task in done:
+                players, error_message = task.result()
+                record_health(task)
+                if not error_message and players:
+                    rosters[tasks[task]] = normalize_roster(players)
+    except asyncio.CancelledError:
+        # The refresh itself was cancelled, so stop every host with it
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+
+    for task in pending:
+        task.add_done_callback(record_health)
+        pool.detach(task)
+
+    if winner is None:
+        if not errors:
+            # Every host answered, and nobody is connected
+            return RosterResult([], None, candidates[0] if candidates else None, {})
+        if len(candidates) == 1:
+            return RosterResult([], errors[0], None, {})
+        return RosterResult([], f"None of {len(candidates)} hosts returned a roster.\n\nFirst error: {errors[0]}", None, {})
+
+    disagreements = {}
+    for host, players in rosters.items():
+        if host != winner:
+            joined, left, moved = diff_rosters(rosters[winner], players)
+            if joined or left or moved:
+                disagreements[host] = (joined, left, moved)
+    return RosterResult(rosters[winner], None, winner, disagreements)
+
+def describe_roster_disagreements(disagreements):
+    """Returns: one readable line per host whose roster differs from the one used."""
+    lines = []
+    for host, (joined, left, moved) in disagreements.items():
+        details = [f"{new_player['name']} in slot {new_player['slot']} (not {old_player['slot']})" for old_player, new_player in moved]
+        details.extend(f"{player['name']} only here" for player in joined)
+        details.extend(f"{player['name']} missing" for player in left)
+        lines.append(f"{host}: {', '.join(details)}")
+    return lines
+
+class RosterWatcher:
+    """
+    Keeps the console of one host subscribed and reports roster changes as they happen.
+    'voice_show_mute' is re-read every poll_interval seconds, or straight away when a join/leave line
+    shows up in the console stream; on_change(players, joined, left, moved) is called only when the
+    roster actually changed, and on_error(error_message) when a check fails.
+    """
+
+    def __init__(self, pool, host, port, on_change, on_error=None, players=None,
+                 poll_interval=WATCH_POLL_INTERVAL):
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.on_change = on_change
+        self.on_error = on_error
+        self.players = normalize_roster(players or [])
+        self.poll_interval = poll_interval
+        self._roster_event = asyncio.Event()
+        # Join/leave lines can be cut across chunks, so they are matched once complete
+        self._console_lines = ConsoleLineBuffer()
+
+    def _on_console_output(self, chunk):
+        if any(ROSTER_EVENT_PATTERN.search(line) for line in self._console_lines.feed(chunk)):
+            self._roster_event.set()
+
+    async def run(self):
+        """Watches until cancelled."""
+        session = self.pool.get(self.host, self.port)
+        session.listeners.append(self._on_console_output)
         try:
-            bindings_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), BINDINGS_FILE) if hasattr(os, 'path') and os.path.abspath(__file__) else BINDINGS_FILE
-
-            if os.path.exists(bindings_path):
-                with open(bindings_path, 'r') as f:
-                    data = json.load(f)
-                    
-                    host_single = data.pop('host', None)
-                    data.setdefault('hosts', host_single or DEFAULT_TELNET_HOST)
-                    
-                    data.setdefault('bindings', {})
-                    data.setdefault('port', DEFAULT_TELNET_PORT)
-                    return data
-        except Exception:
-            pass
-        
-        return {'bindings': {}, 'hosts': DEFAULT_TELNET_HOST, 'port': DEFAULT_TELNET_PORT}
+            while True:
+                await self.check_once()
+                try:
+                    await asyncio.wait_for(self._roster_event.wait(), timeout=self.poll_interval)
+                    # Let a burst of join/leave lines settle into one check
+                    await asyncio.sleep(WATCH_MIN_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._roster_event.clear()
+        finally:
+            session.listeners.remove(self._on_console_output)
 
-    def _save_data(self):
-        """Saves current data (bindings, hosts, port) to a local JSON file."""
-        self.persistent_data['hosts'] = self.hosts_var.get()
-        self.persistent_data['port'] = self.port_var.get()
-        self.persistent_data['bindings'] = self.persistent_bindings
+    async def check_once(self):
+        with timings.operation('watch'):
+            fetched_players, error_message = await fetch_players_async(self.host, self.port, self.pool)
+        if error_message:
+            if self.on_error:
+                self.on_error(error_message)
+            return
+
+        players = normalize_roster(fetched_players)
+        joined, left, moved = diff_rosters(self.players, players)
+        self.players = players
+        if joined or left or moved:
+            self.on_change(players, joined, left, moved)
+
+# --- Bind logic and persistence (GUI-independent) ---
+
+# Terms used to identify users who should be excluded from the Halftime Swap
+EXCLUSION_TERMS = ["coach", "spectator", "spec", "caster", "admin"]
+
+# Halftime swap layouts. Each group is one team's keys, in the same order for every team; on the swap,
+# every key moves 'steps' groups along (wrapping around), e.g. 1->6 and 6->1 for the standard layout.
+# More than two groups give multi-step rotations (A->B->C->A).
+SWAP_LAYOUTS = {
+    # 1->6, 2->7, 3->8, 4->9, 5->0, 6->1, 7->2, 8->3, 9->4, 0->5
+    "standard": {"groups": [["1", "2", "3", "4", "5"], ["6", "7", "8", "9", "0"]]},
+    # Numpad 1-5 <-> 6-0, by CS2 key name
+    "numpad": {"groups": [["kp_end", "kp_downarrow", "kp_pgdn", "kp_leftarrow", "kp_5"],
+                          ["kp_rightarrow", "kp_home", "kp_uparrow", "kp_pgup", "kp_ins"]]},
+    # 2v2 wingman: 1-2 <-> 3-4
+    "wingman": {"groups": [["1", "2"], ["3", "4"]]},
+}
+
+# Player names remembered per exclusion matcher, so repeated swaps and previews never rescan a name
+EXCLUSION_CACHE_SIZE = 16384
+
+class SwapLayout:
+    """
+    A swap layout compiled once into a lookup table (lower-cased old key -> new key),
+    so swapping a key is a single dictionary lookup whatever the layout's shape.
+    """
+
+    def __init__(self, name, groups, steps=1):
+        self.name = name
+        self.groups = [[str(key) for key in group] for group in groups]
+        self.steps = steps
+        if len(self.groups) < 2:
+            raise ValueError(f"Swap layout '{name}' needs at least two key groups")
+        if len({len(group) for group in self.groups}) != 1:
+            raise ValueError(f"Swap layout '{name}' has key groups of different sizes")
+        all_keys = [key.lower() for group in self.groups for key in group]
+        if len(set(all_keys)) != len(all_keys):
+            raise ValueError(f"Swap layout '{name}' uses a key more than once")
+
+        self.table = {}
+        for index, group in enumerate(self.groups):
+            target = self.groups[(index + steps) % len(self.groups)]
+            for position, key in enumerate(group):
+                self.table[key.lower()] = target[position]
+
+    @classmethod
+    def from_definition(cls, name, definition):
+        """Compiles a SWAP_LAYOUTS-style dict: {"groups": [[...], [...]], "steps": 1}."""
+        if not isinstance(definition, dict) or not isinstance(definition.get("groups"), list):
+            raise ValueError(f"Swap layout '{name}' must be an object with a 'groups' list")
+        return cls(name, definition["groups"], int(definition.get("steps", 1)))
+
+    @classmethod
+    def from_key_map(cls, key_map, name="custom"):
+        """Wraps a plain old key -> new key dict."""
+        layout = cls.__new__(cls)
+        layout.name, layout.groups, layout.steps = name, [], 1
+        layout.table = {str(old).lower(): str(new) for old, new in key_map.items()}
+        return layout
+
+    def swap(self, key):
+        """Returns: the key after the swap (keys outside the layout are kept)."""
+        return self.table.get(key.lower(), key) if key else key
+
+class ExclusionMatcher:
+    """
+    Exclusion terms compiled into one case-insensitive pattern, with the verdict cached per name,
+    so classifying a roster costs one regex search per new name and a dict lookup after that.
+    """
+
+    def __init__(self, terms=EXCLUSION_TERMS):
+        self.terms = tuple(terms)
+        # Longest first, so the alternation never stops at a shorter overlapping term
+        alternatives = sorted({term.lower() for term in self.terms if term}, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, alternatives)), re.IGNORECASE) if alternatives else None
+        self.is_excluded = functools.lru_cache(maxsize=EXCLUSION_CACHE_SIZE)(self._match)
+
+    def _match(self, name):
+        return bool(self._pattern and name and self._pattern.search(name))
+
+@functools.lru_cache(maxsize=8)
+def compile_exclusion_matcher(terms):
+    """Returns: the shared ExclusionMatcher for a tuple of terms, compiled on first use."""
+    return ExclusionMatcher(terms)
+
+def load_swap_layouts(path=None):
+    """
+    Compiles the built-in SWAP_LAYOUTS plus any in SWAP_LAYOUTS_FILE (which may override a built-in one).
+    Returns: ({name: SwapLayout}, list of error messages for custom layouts that were skipped)
+    """
+    layouts = {name: SwapLayout.from_definition(name, definition) for name, definition in SWAP_LAYOUTS.items()}
+    errors = []
+    layouts_path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), SWAP_LAYOUTS_FILE)
+    if not os.path.exists(layouts_path):
+        return layouts, errors
+
+    try:
+        with open(layouts_path, 'r', encoding='utf-8') as f:
+            custom = json.load(f)
+        if not isinstance(custom, dict):
+            raise ValueError("expected an object of name -> layout")
+    except (OSError, ValueError) as e:
+        return layouts, [f"Could not read {SWAP_LAYOUTS_FILE}: {e}"]
 
+    for name, definition in custom.items():
         try:
-            with open(BINDINGS_FILE, 'w') as f:
-                json.dump(self.persistent_data, f, indent=4)
-        except Exception as e:
-            messagebox.showwarning("Save Error", f"Could not save persistent data: {e}")
+            layouts[name] = SwapLayout.from_definition(name, definition)
+        except (ValueError, TypeError) as e:
+            errors.append(str(e))
+    return layouts, errors
 
-    def _get_hosts_list(self):
-        """Parses the comma-separated hosts string into a clean list of IPs."""
-        hosts_string = self.hosts_var.get()
-        if not hosts_string:
-            return []
-        
-        hosts = [h.strip() for h in re.split(r'[;,\s]+', hosts_string) if h.strip()]
-        return hosts
-
-    def setup_ui(self):
-        # --- Connection Configuration Frame ---
-        config_frame = tk.Frame(self.root, padx=10, pady=5, bd=2, relief=tk.GROOVE)
-        config_frame.pack(fill=tk.X)
-
-        tk.Label(config_frame, text="Telnet Host IPs (comma-separated):", anchor="w").grid(row=0, column=0, padx=5, pady=2, sticky="w")
-        hosts_entry = tk.Entry(config_frame, textvariable=self.hosts_var, relief=tk.SUNKEN)
-        hosts_entry.grid(row=0, column=1, padx=5, pady=2, sticky="ew", columnspan=3)
-
-        tk.Label(config_frame, text="Port:", anchor="w").grid(row=1, column=0, padx=5, pady=2, sticky="w")
-        port_entry = tk.Entry(config_frame, textvariable=self.port_var, width=8, relief=tk.SUNKEN)
-        port_entry.grid(row=1, column=1, padx=5, pady=2, sticky="w")
-        
-        config_frame.grid_columnconfigure(1, weight=1)
-        
-        # --- Control Buttons Frame ---
-        controls_frame = tk.Frame(self.root, padx=10, pady=10)
-        controls_frame.pack(fill=tk.X)
-        
-        # Renamed from "1. Refresh Player List"
-        self.refresh_button = tk.Button(controls_frame, text="Refresh List", command=self.threaded_refresh_players, bg='#475569', fg='white', relief=tk.RAISED, activebackground='#64748b')
-        self.refresh_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, ipady=5)
-        
-        # Renamed from "2. Send Binds Live (via Telnet)"
-        self.send_button = tk.Button(controls_frame, text="Send Binds", command=self.threaded_send_binds, font=("Segoe UI", 9, "bold"), bg='#10b981', fg='white', relief=tk.RAISED, activebackground='#059669')
-        self.send_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, ipady=5)
-        
-        # Renamed from "3. Halftime Swap (Keys 1-5 <-> 6-0)"
-        self.swap_button = tk.Button(controls_frame, text="Swap", command=self.halftime_swap, font=("Segoe UI", 9, "bold"), bg='#f97316', fg='white', relief=tk.RAISED, activebackground='#ea580c')
-        self.swap_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, ipady=5)
-        
-        tk.Label(self.root, text="Current Player Bindings (Enter Key below)", font=("Segoe UI", 10, "bold"), pady=5).pack(fill=tk.X)
-
-        # --- Player List Scrollable Area ---
-        self.player_canvas = tk.Canvas(self.root, borderwidth=0)
-        self.player_canvas.pack(side="left", fill="both", expand=True, padx=10, pady=(0, 5))
-
-        self.scrollbar = tk.Scrollbar(self.root, orient="vertical", command=self.player_canvas.yview)
-        self.scrollbar.pack(side="right", fill="y")
-        self.player_canvas.configure(yscrollcommand=self.scrollbar.set)
-
-        self.player_frame = tk.Frame(self.player_canvas)
-        self.player_canvas.create_window((0, 0), window=self.player_frame, anchor="nw")
-        
-        self.player_frame.bind("<Configure>", lambda e: self.player_canvas.config(scrollregion=self.player_canvas.bbox("all")))
-        
-        # Status Bar
-        self.status_label = tk.Label(self.root, text="Set IPs/Port and click 'Refresh'.", bd=1, relief=tk.SUNKEN, anchor=tk.W, padx=10, pady=2, fg='#475569')
-        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+@functools.lru_cache(maxsize=1)
+def get_swap_layouts():
+    """load_swap_layouts() for the default file, compiled once per run."""
+    return load_swap_layouts()
+
+def resolve_swap_layout(layout=None):
+    """
+    Accepts a SwapLayout, a layout name, a plain old key -> new key dict, or None for DEFAULT_SWAP_LAYOUT.
+    Returns: SwapLayout
+    """
+    if isinstance(layout, SwapLayout):
+        return layout
+    if isinstance(layout, dict):
+        return SwapLayout.from_key_map(layout)
+    layouts = get_swap_layouts()[0]
+    name = layout or DEFAULT_SWAP_LAYOUT
+    if name not in layouts:
+        raise ValueError(f"Unknown swap layout '{name}'. Available: {', '.join(sorted(layouts))}")
+    return layouts[name]
+
+def get_data_path():
+    """The settings file always lives next to this script, whatever the working directory."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), BINDINGS_FILE)
+
+def load_data(path=None):
+    """Loads persistent settings (hosts, port, profiles) from a local JSON file."""
+    try:
+        bindings_path = path or get_data_path()
+
+        if os.path.exists(bindings_path):
+            with open(bindings_path, 'r') as f:
+                data = json.load(f)
+                
+                host_single = data.pop('host', None)
+                data.setdefault('hosts', host_single or DEFAULT_TELNET_HOST)
+                
+                data.setdefault('port', DEFAULT_TELNET_PORT)
+                return data
+    except Exception:
+        pass
     
-    def _is_player_excluded(self, player_obj):
-        """Helper to check if a player should be excluded from the symmetrical swap."""
-        if player_obj and player_obj['name']:
-            name = player_obj['name'].lower()
-            return any(term in name for term in self.EXCLUSION_TERMS)
-        return False
+    return {'hosts': DEFAULT_TELNET_HOST, 'port': DEFAULT_TELNET_PORT}
+
+def save_data(data, path=None):
+    """Atomically saves settings (hosts, port, profiles) to the local JSON file. Raises OSError if it cannot be written."""
+    write_file_atomic(path or get_data_path(), json.dumps(data, indent=4))
+
+class DataStore:
+    """
+    Write-behind persistence for the settings file.
+    save() only takes a snapshot and returns; a background thread writes the newest snapshot once
+    saves have been quiet for 'debounce' seconds, so a burst of refresh/send/swap clicks costs
+    one atomic write and the caller never waits on the disk.
+    """
+
+    def __init__(self, path=None, debounce=SAVE_DEBOUNCE, on_error=None):
+        self.path = path or get_data_path()
+        self.debounce = debounce
+        # Called with the exception (from the writer thread) when a write fails
+        self.on_error = on_error
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._pending_seq = 0
+        self._written_seq = 0
+        self._last_save_at = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, data):
+        """Queues a copy of 'data' to be written."""
+        snapshot = copy.deepcopy(data)
+        with self._condition:
+            self._pending_seq += 1
+            self._pending = (self._pending_seq, snapshot)
+            self._last_save_at = time.monotonic()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                # Coalesce: keep waiting while new saves keep arriving
+                while self._pending is not None and not self._closed:
+                    remaining = self._last_save_at + self.debounce - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                pending, self._pending = self._pending, None
+                closed = self._closed
+            if pending is not None:
+                self._write(*pending)
+            if closed:
+                return
+
+    def _write(self, seq, data):
+        with self._write_lock:
+            # A flush may already have written a newer snapshot
+            if seq <= self._written_seq:
+                return
+            try:
+                with timings.measure('save', operation='settings'):
+                    save_data(data, self.path)
+                self._written_seq = seq
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+
+    def flush(self):
+        """Writes any pending snapshot right away on the calling thread."""
+        with self._condition:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            self._write(*pending)
+
+    def close(self):
+        """Writes whatever is pending and stops the writer thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+def parse_hosts(hosts_string):
+    """Parses the comma-separated hosts string into a clean list of IPs."""
+    if not hosts_string:
+        return []
     
-    def halftime_swap(self):
+    return [h.strip() for h in re.split(r'[;,\s]+', hosts_string) if h.strip()]
+
+def normalize_roster(fetched_players):
+    """Drops slots that came back with empty names and sorts the rest by slot."""
+    connected_players = [p for p in fetched_players if p.get('name')]
+    connected_players.sort(key=lambda p: p['slot'])
+    return connected_players
+
+def normalize_player_name(name):
+    """Lowercases a name and drops clan tags, spacing and symbols, so "[NEW] Player" still matches "OLD | player"."""
+    stripped = CLAN_TAG_PATTERN.sub('', name.strip())
+    normalized = re.sub(r'[\W_]+', '', stripped.casefold())
+    return normalized or name.strip().casefold()
+
+def profile_chain(team_profile=None, match_profile=None):
+    """
+    Profiles consulted for a key, most specific first: the match, then the team, then the default.
+    Keys are saved to the first one.
+    Returns: list of (kind, name)
+    """
+    chain = []
+    if match_profile:
+        chain.append(('match', match_profile))
+    if team_profile:
+        chain.append(('team', team_profile))
+    chain.append(('default', DEFAULT_PROFILE))
+    return chain
+
+class RosterDB:
+    """
+    Indexed store of every player's bind key per team/match profile, kept in a local SQLite file.
+    Players are found by SteamID when it is known, then by exact name, then by normalized name, so a
+    clan tag change keeps their key; every lookup is an indexed query rather than a scan of the
+    season's history, and two players in one roster never share a row. The file is not opened until the first lookup; all database work runs in order on one
+    worker thread, so saves never block the caller.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), ROSTER_DB_FILE)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="roster-db")
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            # Imported here so tools that never touch the database do not pay for sqlite3
+            import sqlite3
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript(ROSTER_DB_SCHEMA)
+        return self._connection
+
+    def resolve_keys_future(self, players, team_profile=None, match_profile=None):
+        """Like resolve_keys, but returns a concurrent.futures.Future instead of waiting."""
+        return self._executor.submit(self._resolve_keys, players, profile_chain(team_profile, match_profile))
+
+    def resolve_keys(self, players, team_profile=None, match_profile=None):
+        """Returns: list of saved keys ('' if none) parallel to players."""
+        return self.resolve_keys_future(players, team_profile, match_profile).result()
+
+    def save_keys(self, players, keys, team_profile=None, match_profile=None):
         """
-        Performs a rotational swap of the bind keys (1<->6, 2<->7, etc.) on the GUI,
-        saves the new configuration, and then automatically triggers the Telnet send.
+        Queues each player's key to be saved to the most specific profile. An empty key is saved too, so
+        clearing a key there is not undone by a key the player has in a less specific profile.
+        Players not in 'players' keep their keys. Returns: a Future that completes once written.
         """
-        if not self.players:
-             messagebox.showwarning("Swap Failed", "Player list is empty. Please 'Refresh List' first.")
-             return
-
-        # 1. Store the keys BEFORE the swap for status message (sampling 1 and 6)
-        pre_swap_keys = {
-            '1': self.entry_widgets[self.slot_to_index.get(1)].get().strip() if 1 in self.slot_to_index else '',
-            '6': self.entry_widgets[self.slot_to_index.get(6)].get().strip() if 6 in self.slot_to_index else ''
-        }
-        
-        # 2. Iterate over all displayed players and swap the keys in the GUI entries
-        for i, player in enumerate(self.players):
-            
-            data = self.players[i]
-            entry = self.entry_widgets[i]
-            
-            if self._is_player_excluded(data):
+        return self._executor.submit(self._save_keys, list(players), list(keys),
+                                     profile_chain(team_profile, match_profile)[0])
+
+    def import_bindings(self, bindings, team_profile=None, match_profile=None):
+        """Queues a name -> key dict (the old JSON format) to be saved. Returns: a Future."""
+        players = [{'name': name} for name in bindings]
+        return self.save_keys(players, list(bindings.values()), team_profile, match_profile)
+
+    def close(self):
+        """Finishes queued saves and closes the database."""
+        self._executor.submit(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _profile_ids(self, connection, chain):
+        profile_ids = []
+        for kind, name in chain:
+            row = connection.execute("SELECT id FROM profiles WHERE kind = ? AND name = ?", (kind, name)).fetchone()
+            if row:
+                profile_ids.append(row[0])
+        return profile_ids
+
+    def _resolve_keys(self, players, chain):
+        connection = self._connect()
+        profile_ids = self._profile_ids(connection, chain)
+        if not profile_ids:
+            return [''] * len(players)
+
+        placeholders = ','.join('?' * len(profile_ids))
+        by_player = f"SELECT profile_id, key FROM profile_keys WHERE player_id = ? AND profile_id IN ({placeholders})"
+
+        keys = []
+        for player, player_id in zip(players, self._find_players(connection, players)):
+            if player_id is None:
+                keys.append('')
                 continue
+            # The most specific profile wins
+            keys_by_profile = dict(connection.execute(by_player, (player_id, *profile_ids)).fetchall())
+            keys.append(next((keys_by_profile[pid] for pid in profile_ids if pid in keys_by_profile), ''))
+        return keys
 
-            current_key = entry.get().strip()
-            
-            if current_key in self.SWAP_KEY_MAP:
-                new_key = self.SWAP_KEY_MAP[current_key]
-                
-                entry.delete(0, tk.END)
-                entry.insert(0, new_key)
-            
-        # 3. Update persistent bindings based on the final state of the GUI
-        self.persistent_bindings = {}
-        for i, player in enumerate(self.players):
-            key = self.entry_widgets[i].get().strip()
-            
-            if key:
-                self.persistent_bindings[player['name']] = key
-        
-        # 4. Save to file
-        self._save_data() 
-
-        # 5. Update status bar and show message *before* starting the send thread
-        post_swap_keys = {
-            '1': self.entry_widgets[self.slot_to_index.get(1)].get().strip() if 1 in self.slot_to_index else '',
-            '6': self.entry_widgets[self.slot_to_index.get(6)].get().strip() if 6 in self.slot_to_index else ''
-        }
-        
-        status_text = (
-            f"GUI Swap Complete. Keys rotated: 1->{post_swap_keys.get('1', 'N/A')}, 6->{post_swap_keys.get('6', 'N/A')}. "
-            f"NOW SENDING BINDS LIVE..."
-        )
-        self.status_label.config(text=status_text)
-        
-        messagebox.showinfo("Swap & Send Initiated", "Keys have been rotated (1<->6, etc.) and the commands are now being sent live to CS2 via Telnet.")
-
-        # 6. CRITICAL CHANGE: Automatically trigger the send function
-        self.threaded_send_binds()
-
-
-    def threaded_refresh_players(self):
-        hosts = self._get_hosts_list()
-        
-        if not hosts:
-            messagebox.showerror("Configuration Error", "Please enter at least one Host IP.")
-            return
+    def _find_players(self, connection, players):
+        """
+        Returns: the row id (or None) for each player. Players matched by SteamID or exact name are
+        placed first, so a normalized-name match can never take a row another player in the same roster
+        owns outright, and no two players ever get the same row.
+        """
+        player_ids = [self._find_player(connection, player, fuzzy=False) for player in players]
+        taken = {player_id for player_id in player_ids if player_id is not None}
+        for index, player in enumerate(players):
+            if player_ids[index] is None:
+                player_ids[index] = self._find_player(connection, player, taken)
+                if player_ids[index] is not None:
+                    taken.add(player_ids[index])
+        return player_ids
 
-        host = hosts[0] 
-        try:
-            port = int(self.port_var.get())
-        except ValueError:
-            messagebox.showerror("Configuration Error", "Port must be a valid number.")
-            return
-        
-        self._save_data() 
-        
-        self.status_label.config(text=f"Connecting to {host}:{port} to fetch players...")
-        self.refresh_button.config(state=tk.DISABLED)
-        self.send_button.config(state=tk.DISABLED)
-        self.swap_button.config(state=tk.DISABLED) 
-        
-        threading.Thread(target=self._run_async_fetch, args=(host, port), daemon=True).start()
-
-    def _run_async_fetch(self, host, port):
-        fetched_players, error_message = asyncio.run(fetch_players_async(host, port))
-        self.root.after(0, self.populate_player_list, fetched_players, error_message)
-
-    def populate_player_list(self, fetched_players, error_message):
+    def _find_player(self, connection, player, taken=(), fuzzy=True):
         """
-        Clears and rebuilds the UI, showing *only* connected players, 
-        and updates the self.players list used by all other functions.
+        Returns: the id of the row for this player, or None. Tried in order: the SteamID, the exact name,
+        then (if 'fuzzy') the normalized name, most recently seen first. Name matches in 'taken' already
+        belong to another player and are skipped.
         """
-        
-        self.refresh_button.config(state=tk.NORMAL)
-        self.send_button.config(state=tk.NORMAL)
-        self.swap_button.config(state=tk.NORMAL) 
-        
-        if error_message:
-            messagebox.showerror("Connection/Telnet Error", error_message)
-            self.status_label.config(text=f"ERROR: Failed to connect to {self._get_hosts_list()[0]}. See error box.")
-            return
-        
-        # 1. Filter out any slots that were returned but have empty names
-        connected_players = [p for p in fetched_players if p.get('name')]
-        connected_players.sort(key=lambda p: p['slot'])
-        
-        # 2. Update the master list used by all other functions
-        self.players = connected_players
-        self.slot_to_index = {p['slot']: i for i, p in enumerate(self.players)}
-
-        # Clear existing player list UI
-        for widget in self.player_frame.winfo_children():
-            widget.destroy()
-        self.entry_widgets.clear()
-        
-        # Draw Headers
-        tk.Label(self.player_frame, text="Bind Key", font=("Segoe UI", 9, "bold")).grid(row=0, column=0, padx=5, pady=5)
-        tk.Label(self.player_frame, text="Player Name (Slot)", font=("Segoe UI", 10, "bold")).grid(row=0, column=1, padx=5, sticky="w")
-        
-        # 3. Draw rows for all connected players
-        for i, player in enumerate(self.players):
-            entry = tk.Entry(self.player_frame, width=8, justify='center')
-            
-            # Persistence Load: Try to load the key based on the player's name
-            if player['name'] in self.persistent_bindings:
-                saved_key = self.persistent_bindings[player['name']]
-                entry.insert(0, saved_key)
-            
-            entry.grid(row=i + 1, column=0, padx=5, pady=2)
-            self.entry_widgets.append(entry)
-            
-            # Display Label 
-            label_text = f"{player['name']} (Slot: {player['slot']})"
-            label = tk.Label(self.player_frame, text=label_text, anchor='w')
-            label.grid(row=i + 1, column=1, padx=5, sticky="w")
-            
-        # Update scroll region and status bar
-        self.player_canvas.update_idletasks()
-        self.player_canvas.config(scrollregion=self.player_canvas.bbox("all"))
-
-        active_count = len([p for p in self.players if 1 <= p['slot'] <= 10])
-        spectator_count = len([p for p in self.players if p['slot'] > 10])
-            
-        status_text = f"Successfully fetched {len(self.players)} connected users ({active_count} players, {spectator_count} spectators)."
-        self.status_label.config(text=status_text)
-
-
-    def threaded_send_binds(self):
-        """Prepares commands, updates persistence, and runs async send function."""
-        # Note: This function is called by both the 'Send' button and the 'Swap' button.
-        if not self.players:
-            # Only show this error if called directly by the button and data is missing
-            if self.send_button['state'] == tk.NORMAL:
-                messagebox.showwarning("Warning", "Player list is empty. Refresh first.")
-            return
+        if player.get('steamid'):
+            row = connection.execute("SELECT id FROM players WHERE steamid = ?", (player['steamid'],)).fetchone()
+            if row:
+                return row[0]
+            # Never merge two different SteamIDs that happen to share a name
+            only_without_steamid = "AND steamid IS NULL "
+        else:
+            only_without_steamid = ""
+        lookups = [('display_name', player['name'])]
+        if fuzzy:
+            lookups.append(('normalized_name', normalize_player_name(player['name'])))
+        for column, name in lookups:
+            rows = connection.execute(f"SELECT id FROM players WHERE {column} = ? {only_without_steamid}"
+                                      f"ORDER BY last_seen DESC", (name,))
+            for (player_id,) in rows:
+                if player_id not in taken:
+                    return player_id
+        return None
 
-        hosts = self._get_hosts_list()
-        if not hosts:
-            messagebox.showerror("Configuration Error", "Please enter at least one Host IP.")
-            return
+    def _save_keys(self, players, keys, profile):
+        connection = self._connect()
+        with timings.measure('save', operation='keys'), connection:
+            connection.execute("INSERT OR IGNORE INTO profiles (kind, name) VALUES (?, ?)", profile)
+            profile_id = connection.execute("SELECT id FROM profiles WHERE kind = ? AND name = ?", profile).fetchone()[0]
+            now = time.time()
+
+            for player, key, player_id in zip(players, keys, self._find_players(connection, players)):
+                if not key and player_id is None:
+                    # No saved key anywhere to override
+                    continue
+
+                if player_id is None:
+                    player_id = connection.execute(
+                        "INSERT INTO players (steamid, display_name, normalized_name, last_seen) VALUES (?, ?, ?, ?)",
+                        (player.get('steamid'), player['name'], normalize_player_name(player['name']), now),
+                    ).lastrowid
+                else:
+                    connection.execute(
+                        "UPDATE players SET display_name = ?, normalized_name = ?, last_seen = ?, "
+                        "steamid = COALESCE(steamid, ?) WHERE id = ?",
+                        (player['name'], normalize_player_name(player['name']), now, player.get('steamid'), player_id),
+                    )
+                connection.execute(
+                    "INSERT INTO profile_keys (profile_id, player_id, key) VALUES (?, ?, ?) "
+                    "ON CONFLICT (profile_id, player_id) DO UPDATE SET key = excluded.key",
+                    (profile_id, player_id, key),
+                )
+
+def migrate_json_bindings(data, roster_db):
+    """
+    Moves name -> key bindings left in the settings file by older versions into the roster database
+    (default profile). The bindings stay in 'data' until the database has them, so a failed import loses nothing.
+    Returns: True if 'data' changed and should be saved. Raises whatever the import raised (e.g. sqlite3.Error).
+    """
+    if 'bindings' not in data:
+        return False
+    if data['bindings']:
+        roster_db.import_bindings(data['bindings']).result()
+    del data['bindings']
+    return True
+
+def swap_keys(players, keys, layout=None, exclusion_terms=EXCLUSION_TERMS):
+    """
+    Performs the rotational halftime swap (1<->6, 2<->7, etc. for the standard layout) on a list of keys
+    parallel to players, in one pass. 'layout' is anything resolve_swap_layout() accepts.
+    Excluded users and keys outside the layout keep their key.
+    Returns: the new list of keys
+    """
+    table = resolve_swap_layout(layout).table
+    is_excluded = compile_exclusion_matcher(tuple(exclusion_terms)).is_excluded
+    swapped = []
+    for player, key in zip(players, keys):
+        new_key = table.get(key.lower()) if key else None
+        if new_key is not None and not is_excluded(player['name']):
+            key = new_key
+        swapped.append(key)
+    return swapped
+
+# A second-half bind set computed ahead of the swap: the keys before and after, the bind map to send,
+# and any problems found (e.g. two players ending up on the same key)
+StagedSwap = collections.namedtuple('StagedSwap', ['players', 'keys', 'swapped_keys', 'bind_map', 'warnings', 'layout'])
 
+def stage_halftime_swap(players, keys, layout=None):
+    """
+    Computes and validates the halftime swap in advance, so pressing Swap only has to send it.
+    Returns: StagedSwap
+    """
+    players = [dict(player) for player in players]
+    keys = list(keys)
+    layout = resolve_swap_layout(layout)
+    swapped_keys = swap_keys(players, keys, layout)
+
+    names_by_key = {}
+    for player, key in zip(players, swapped_keys):
+        if key:
+            names_by_key.setdefault(key, []).append(player['name'])
+    warnings = [f"Key {key} is bound to {' and '.join(names)} after the swap"
+                for key, names in names_by_key.items() if len(names) > 1]
+
+    return StagedSwap(players, keys, swapped_keys, build_bind_map(players, swapped_keys), warnings, layout.name)
+
+def fetch_players(host, port, timeout=HOST_TIMEOUT):
+    """
+    Blocking one-shot version of fetch_players_async for scripts; opens and closes its own session.
+    Returns: (list of players, error_message or None)
+    """
+    async def fetch_once():
+        pool = NetconPool(timeout)
         try:
-            port = int(self.port_var.get())
-        except ValueError:
-            messagebox.showerror("Configuration Error", "Port must be a valid number.")
-            return
-        
-        # Always start by disabling the default number keys to allow custom binds
-        bind_commands = ['spec_usenumberkeys_nobinds false']
-        new_bindings = {} 
-
-        # This loop processes commands for *all* connected players
-        for i, player in enumerate(self.players):
-            key = self.entry_widgets[i].get().strip()
-            player_name_key = player['name']
-            
-            # Only send a bind command if a key is entered
-            if key:
-                # The command uses the current Server Slot (player['slot']) and the key in the GUI
-                command = f'bind "{key}" "spec_player {player["slot"]}"'
-                bind_commands.append(command)
-                
-                # Update persistent data with the current assignment (Player Name -> Key)
-                new_bindings[player_name_key] = key
-        
-        # Store the updated bindings and settings immediately for persistence
-        self.persistent_bindings = new_bindings
-        self._save_data()
-        
-        # Run the async send function in a thread
-        self.status_label.config(text=f"Sending commands to {len(hosts)} host(s)...")
-        self.send_button.config(state=tk.DISABLED)
-        self.refresh_button.config(state=tk.DISABLED)
-        self.swap_button.config(state=tk.DISABLED) 
-        
-        threading.Thread(target=self._run_async_send, args=(hosts, port, bind_commands), daemon=True).start()
-        
-    def _run_async_send(self, hosts, port, bind_commands):
-        """Iterates through all hosts and runs the async send for each one."""
-        all_results = []
-        
-        for host in hosts:
-            success, error_message = asyncio.run(send_bind_commands_async(host, port, bind_commands))
-            all_results.append((host, success, error_message))
-                
-        self.root.after(0, self._handle_send_completion, all_results)
-
-    def _handle_send_completion(self, all_results):
-        self.send_button.config(state=tk.NORMAL)
-        self.refresh_button.config(state=tk.NORMAL)
-        self.swap_button.config(state=tk.NORMAL) 
-        
-        failed_hosts = [host for host, success, error in all_results if not success]
-        
-        if not failed_hosts:
-            self.status_label.config(text="SUCCESS: Binds sent live to all configured CS2 instances!")
+            return await fetch_players_async(host, port, pool)
+        finally:
+            await pool.close_all()
+
+    return asyncio.run(fetch_once())
+
+def send_binds(hosts, port, bind_map, on_result=None, timeout=HOST_TIMEOUT):
+    """
+    Blocking one-shot version of send_bind_commands_to_hosts_async for scripts.
+    Every host gets a full sync, since a fresh session has no record of what was applied before.
+    Returns: list of (host, success_boolean, error_message or None) in completion order.
+    """
+    async def send_once():
+        pool = NetconPool(timeout)
+        try:
+            return await send_bind_commands_to_hosts_async(hosts, port, bind_map, pool, on_result=on_result,
+                                                           timeout=timeout)
+        finally:
+            await pool.close_all()
+
+    return asyncio.run(send_once())
+
+# --- Command line interface ---
+
+def _cli_fetch_roster(hosts, port):
+    async def fetch_once():
+        pool = NetconPool()
+        try:
+            return await fetch_players_from_hosts_async(hosts, port, pool)
+        finally:
+            await pool.close_all()
+
+    result = asyncio.run(fetch_once())
+    if result.error_message:
+        print(f"ERROR: {result.error_message}", file=sys.stderr)
+        return None
+    for line in describe_roster_disagreements(result.disagreements):
+        print(f"WARNING: slot mapping differs on {line}", file=sys.stderr)
+    return result.players
+
+def _cli_send(hosts, port, players, keys):
+    def print_result(host, success, error_message):
+        print(f"{host}: {'OK' if success else 'FAILED - ' + str(error_message)}")
+
+    results = send_binds(hosts, port, build_bind_map(players, keys), on_result=print_result)
+    return 0 if all(success for host, success, error in results) else 1
+
+def _cli_watch(hosts, port, roster_db, profiles, rebind):
+    async def watch():
+        pool = NetconPool()
+        # Keeps fire-and-forget rebind tasks referenced until they finish
+        rebind_tasks = set()
+
+        async def rebind_players(players):
+            keys = await asyncio.wrap_future(roster_db.resolve_keys_future(players, *profiles))
+            await send_bind_commands_to_hosts_async(hosts, port, build_bind_map(players, keys), pool)
+
+        def print_changes(players, joined, left, moved):
+            for player in joined:
+                print(f"+ {player['name']} (Slot: {player['slot']})")
+            for player in left:
+                print(f"- {player['name']} (Slot: {player['slot']})")
+            for old_player, new_player in moved:
+                print(f"~ {new_player['name']} (Slot: {old_player['slot']} -> {new_player['slot']})")
+
+            # The diffing send only pushes binds whose slot actually changed
+            if rebind and (joined or moved):
+                task = asyncio.ensure_future(rebind_players(players))
+                rebind_tasks.add(task)
+                task.add_done_callback(rebind_tasks.discard)
+
+        watcher = RosterWatcher(pool, hosts[0], port, print_changes,
+                                on_error=lambda error_message: print(f"ERROR: {error_message}", file=sys.stderr))
+        try:
+            await watcher.run()
+        finally:
+            await pool.close_all()
+
+    try:
+        asyncio.run(watch())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="observer_binds",
+        description="Chezpuf's CS2 Observer Bind Tool. Run without a command to open the GUI.",
+    )
+    parser.add_argument("--hosts", help="comma-separated host IPs (default: the saved hosts)")
+    parser.add_argument("--port", type=int, help="netcon port (default: the saved port)")
+    parser.add_argument("--team", help="team profile to read/save keys in (default: the saved team profile)")
+    parser.add_argument("--match", help="match profile to read/save keys in (default: the saved match profile)")
+    parser.add_argument("--timings", action="store_true", help="print per-phase timings to stderr when done")
+    parser.add_argument("--layout", help="swap layout, e.g. standard, numpad, wingman (default: the saved layout)")
+    commands = parser.add_subparsers(dest="command")
+    fetch_parser = commands.add_parser("fetch", help="print the connected users and their saved keys")
+    fetch_parser.add_argument("--json", action="store_true", help="print the roster as JSON")
+    commands.add_parser("send", help="send the saved binds for the current roster to every host")
+    commands.add_parser("swap", help="rotate the saved keys for halftime, save them and send them live")
+    watch_parser = commands.add_parser("watch", help="print roster changes as players join, leave or change slot")
+    watch_parser.add_argument("--rebind", action="store_true",
+                              help="re-send the saved binds whenever a player with a key changes slot")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        # Only the GUI needs tkinter, so it is not imported until here
+        from observer_gui import run_gui
+        run_gui()
+        return 0
+
+    data = load_data()
+    hosts = parse_hosts(args.hosts if args.hosts is not None else str(data['hosts']))
+    if not hosts:
+        parser.error("no host IPs configured; pass --hosts")
+    try:
+        port = args.port if args.port is not None else int(data['port'])
+    except ValueError:
+        parser.error("the saved port is not a number; pass --port")
+
+    profiles = (args.team if args.team is not None else data.get('team_profile', ''),
+                args.match if args.match is not None else data.get('match_profile', ''))
+    for error in get_swap_layouts()[1]:
+        print(f"WARNING: {error}", file=sys.stderr)
+    layouts = get_swap_layouts()[0]
+    layout = args.layout if args.layout is not None else data.get('swap_layout', DEFAULT_SWAP_LAYOUT)
+    if layout not in layouts:
+        parser.error(f"unknown swap layout '{layout}'; choose from {', '.join(sorted(layouts))}")
+    args.layout = layout
+    roster_db = RosterDB()
+    try:
+        try:
+            if migrate_json_bindings(data, roster_db):
+                save_data(data)
+        except Exception as e:
+            print(f"WARNING: could not move saved keys into the roster database: {e}", file=sys.stderr)
+        return _cli_run(args, hosts, port, roster_db, profiles)
+    finally:
+        roster_db.close()
+        if args.timings:
+            print(format_timing_summary(timings.summary(by_host=True)), file=sys.stderr)
+
+def _cli_run(args, hosts, port, roster_db, profiles):
+    if args.command == "watch":
+        return _cli_watch(hosts, port, roster_db, profiles, args.rebind)
+
+    players = _cli_fetch_roster(hosts, port)
+    if players is None:
+        return 1
+    keys = roster_db.resolve_keys(players, *profiles)
+
+    if args.command == "fetch":
+        if args.json:
+            print(json.dumps([dict(player, key=key) for player, key in zip(players, keys)]))
         else:
-            first_fail_message = next((error for host, success, error in all_results if not success and error), "One or more hosts failed to connect.")
-            messagebox.showwarning("Partial Success / Failure", f"Failed to connect to the following hosts: {', '.join(failed_hosts)}\n\nFirst error encountered: {first_fail_message}")
-            self.status_label.config(text=f"FAILED: Binds failed on {len(failed_hosts)} of {len(all_results)} hosts. Check warning box.")
+            for player, key in zip(players, keys):
+                print(f"{player['slot']:>3}  {key or '-':<6} {player['name']}")
+        return 0
 
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = ObserverApp(root)
-    root.mainloop()
+    if args.command == "swap":
+        staged = stage_halftime_swap(players, keys, args.layout)
+        for warning in staged.warnings:
+            print(f"WARNING: {warning}", file=sys.stderr)
+        keys = staged.swapped_keys
+        roster_db.save_keys(players, keys, *profiles)
 
+    return _cli_send(hosts, port, players, keys)
+
+if __name__ == "__main__":
+    sys.exit(main())
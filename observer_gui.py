@@ -0,0 +1,791 @@
+"""Tk front end for Chezpuf's Observer Bind Tool. All network and bind logic lives in observer_binds."""
+import tkinter as tk
+from tkinter import messagebox
+import concurrent.futures
+import os
+import time
+
+from observer_binds import (
+    DEFAULT_SWAP_LAYOUT, DEFAULT_TELNET_HOST, DEFAULT_TELNET_PORT, HALFTIME_CFG_NAME, HOST_TIMEOUT, REFRESH_MAX_HOSTS, TIMING_LOG_FILE,
+    TIMING_LOG_MAX_BYTES, TIMING_LOG_PROBES,
+    BackgroundLoop, CommandQueue, DataStore, HostHealth, JsonLinesSink, NetconPool, RosterDB, RosterWatcher, fetch_players_from_hosts_async, send_bind_commands_to_hosts_async,
+    build_bind_map, describe_roster_disagreements, format_timing_summary, get_swap_layouts, load_data, migrate_json_bindings, normalize_roster, parse_hosts, stage_bind_cfg_async, stage_halftime_swap, timings,
+    uses_cfg_delivery,
+)
+
+# Rosters longer than this are drawn through a fixed pool of rows instead of one row per user
+PLAYER_LIST_VIRTUALIZE_AT = 40
+
+# Number of pooled rows shown at once for long rosters
+VIRTUAL_VISIBLE_ROWS = 20
+
+# Key that triggers the halftime swap while the tool has focus
+SWAP_HOTKEY = "<Control-F12>"
+
+# System-wide swap hotkey, registered only if the optional 'keyboard' package is installed
+GLOBAL_SWAP_HOTKEY = "ctrl+f12"
+
+# Milliseconds of quiet after a key edit before the second-half bind set is re-staged
+STAGE_DELAY_MS = 150
+
+# Milliseconds between updates of the open diagnostics window
+DIAGNOSTICS_REFRESH_MS = 1000
+
+class ObserverApp:
+
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Chezpuf's Observer Bind Tool")
+        self.root.geometry("500x670") 
+        
+        # self.players holds a unified list of ALL *connected* slots being displayed
+        self.players = [] 
+        # Maps slot number to the index in self.players and self.key_vars
+        self.slot_to_index = {} 
+        # One StringVar per player holding the bind key typed for them; rows display these
+        self.key_vars = [] 
+        # Row widgets [entry, label, grid_row] keyed by slot, reused between refreshes
+        self.player_rows = {} 
+        # Fixed pool of [entry, label] rows used instead when the roster is too long to draw every row
+        self.virtual_rows = [] 
+        self.virtual_first_index = 0 
+        # The players the current key_vars belong to, so vars can follow a player across refreshes
+        self._row_players = [] 
+        
+        # Persistent storage; saves are queued and written off the UI thread
+        self.persistent_data = load_data()
+        self.store = DataStore(on_error=self._report_save_error)
+        
+        hosts_str = self.persistent_data.get('hosts', DEFAULT_TELNET_HOST)
+        if 'host' in self.persistent_data and self.persistent_data['host'] != hosts_str:
+            hosts_str = self.persistent_data['host']
+            
+        self.hosts_var = tk.StringVar(value=hosts_str)
+        self.port_var = tk.StringVar(value=self.persistent_data.get('port', DEFAULT_TELNET_PORT))
+        self.team_profile_var = tk.StringVar(value=self.persistent_data.get('team_profile', ''))
+        self.match_profile_var = tk.StringVar(value=self.persistent_data.get('match_profile', ''))
+
+        # Swap layouts (built-in plus SWAP_LAYOUTS_FILE), compiled once
+        self.swap_layouts, self.swap_layout_errors = get_swap_layouts()
+        saved_layout = self.persistent_data.get('swap_layout', DEFAULT_SWAP_LAYOUT)
+        self.swap_layout_var = tk.StringVar(value=saved_layout if saved_layout in self.swap_layouts else DEFAULT_SWAP_LAYOUT)
+
+        # Saved keys for every player, per team/match profile; opened lazily on the first lookup
+        self.roster_db = RosterDB()
+        try:
+            migrate_json_bindings(self.persistent_data, self.roster_db)
+        except Exception as e:
+            # The old bindings stay in the settings file, so the next start tries again
+            messagebox.showwarning("Roster Database", f"Could not move saved keys into the roster database:\n{e}")
+
+        # Long-lived netcon sessions, owned by a single background event loop that runs all network I/O;
+        # the GUI only submits operations to it, and a newer send replaces one that has not started yet
+        self.io_loop = BackgroundLoop()
+        self.commands = CommandQueue(self.io_loop)
+        self.pool = NetconPool()
+        # Set by 'Force full resync'; taken by the next send that actually runs, even if others were coalesced
+        self._resync_requested = False
+        # Reachability and round-trip time of every configured host, probed in the background;
+        # sends skip hosts that are down, and hosts that missed a send get it again once they are back
+        self.health = HostHealth(self.pool, on_change=lambda host, status: self.root.after(0, self._show_host_status, host, status))
+        self.host_status = {}
+        self._stale_hosts = set()
+        # Every phase timing (health probes only if TIMING_LOG_PROBES) is appended to TIMING_LOG_FILE
+        # next to this script, if set
+        self.timing_log = None
+        if TIMING_LOG_FILE:
+            try:
+                self.timing_log = JsonLinesSink(os.path.join(os.path.dirname(os.path.abspath(__file__)), TIMING_LOG_FILE),
+                                                TIMING_LOG_MAX_BYTES, () if TIMING_LOG_PROBES else ('probe',))
+                timings.add_sink(self.timing_log)
+            except OSError:
+                self.timing_log = None
+        self.diagnostics_window = None
+        self._diagnostics_after_id = None
+        # Future of the running RosterWatcher while watch mode is on
+        self.watch_future = None
+        # Second-half bind set, re-staged whenever the roster or a key changes
+        self.staged_swap = None
+        self._stage_after_id = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.setup_ui()
+        self._register_swap_hotkeys()
+        self._save_data()
+
+        self.hosts_var.trace_add('write', self._update_health_targets)
+        self.swap_layout_var.trace_add('write', self._on_key_changed)
+        if self.swap_layout_errors:
+            self.status_label.config(text=f"WARNING: {self.swap_layout_errors[0]}")
+        self.port_var.trace_add('write', self._update_health_targets)
+        self._update_health_targets()
+        self.commands.submit('health', self.health.run)
+
+    def on_close(self):
+        """Closes every pooled netcon session before the window goes away."""
+        self._stop_watch()
+        try:
+            self.commands.close()
+            self.io_loop.run(self.pool.close_all(), timeout=HOST_TIMEOUT)
+        except Exception:
+            pass
+        self.io_loop.stop()
+        self.store.close()
+        self.roster_db.close()
+        if self.timing_log is not None:
+            timings.remove_sink(self.timing_log)
+            self.timing_log.close()
+        self.root.destroy()
+
+    def _save_data(self):
+        """Queues current settings (hosts, port, profiles) to be written to the local JSON file."""
+        self.persistent_data['hosts'] = self.hosts_var.get()
+        self.persistent_data['port'] = self.port_var.get()
+        self.persistent_data['team_profile'] = self.team_profile_var.get().strip()
+        self.persistent_data['match_profile'] = self.match_profile_var.get().strip()
+        self.persistent_data['swap_layout'] = self.swap_layout_var.get()
+        self.store.save(self.persistent_data)
+
+    def _profiles(self):
+        """The (team, match) profile names keys are read from and saved to."""
+        return self.team_profile_var.get().strip(), self.match_profile_var.get().strip()
+
+    def _save_keys(self, keys):
+        """Queues the current players' keys to be saved in the roster database."""
+        self.roster_db.save_keys(self.players, keys, *self._profiles())
+
+    def _report_save_error(self, error):
+        # Called from the store's writer thread
+        self.root.after(0, lambda: messagebox.showwarning("Save Error", f"Could not save persistent data: {error}"))
+
+    def _register_swap_hotkeys(self):
+        self.root.bind_all(SWAP_HOTKEY, lambda e: self.halftime_swap())
+        try:
+            import keyboard
+        except ImportError:
+            return
+        try:
+            # keyboard calls back on its own thread, so hand the swap to the Tk thread
+            keyboard.add_hotkey(GLOBAL_SWAP_HOTKEY, lambda: self.root.after(0, self.halftime_swap))
+        except Exception:
+            # e.g. missing permissions for a global hook; the in-app hotkey still works
+            pass
+
+    def _update_health_targets(self, *args):
+        try:
+            port = int(self.port_var.get())
+        except ValueError:
+            port = None
+        # Replaced in one assignment, so the probe loop never sees half an update
+        self.health.targets = (self._get_hosts_list(), port)
+        self._draw_host_status()
+
+    def _show_host_status(self, host, status):
+        """Records a host's health as reported by the I/O loop, and re-sends binds to a host that just came back."""
+        was_down = self.host_status.get(host, {}).get('state') == 'down'
+        self.host_status[host] = status
+        self._draw_host_status()
+
+        if was_down and status['state'] == 'up' and host in self._stale_hosts and self.players:
+            target = self._get_send_target()
+            if target is not None and host in target[0]:
+                self._stale_hosts.discard(host)
+                bind_map = build_bind_map(self.players, self._current_keys())
+                self.status_label.config(text=f"{host} is answering again; re-sending binds to it...")
+                # Its own lane, so it never replaces a queued send to every host
+                future = self.commands.submit(f'resend {host}', lambda: self._run_async_send([host], target[1], bind_map,
+                                                                                              'resend', time.perf_counter()))
+                future.add_done_callback(lambda f: self.root.after(0, self._finish_send, f))
+
+    def _draw_host_status(self):
+        parts = []
+        for host in self._get_hosts_list():
+            status = self.host_status.get(host)
+            if status is None or status['state'] == 'unknown':
+                parts.append(f"{host}: ?")
+            elif status['state'] == 'up' and status['rtt'] is not None:
+                parts.append(f"{host}: up {status['rtt'] * 1000:.0f} ms")
+            elif status['state'] == 'up':
+                parts.append(f"{host}: up")
+            else:
+                parts.append(f"{host}: DOWN")
+        self.host_status_label.config(text="   ".join(parts) or "No hosts configured.")
+
+    def _get_hosts_list(self):
+        """Parses the comma-separated hosts string into a clean list of IPs."""
+        return parse_hosts(self.hosts_var.get())
+
+    def setup_ui(self):
+        # --- Connection Configuration Frame ---
+        config_frame = tk.Frame(self.root, padx=10, pady=5, bd=2, relief=tk.GROOVE)
+        config_frame.pack(fill=tk.X)
+
+        tk.Label(config_frame, text="Telnet Host IPs (comma-separated):", anchor="w").grid(row=0, column=0, padx=5, pady=2, sticky="w")
+        hosts_entry = tk.Entry(config_frame, textvariable=self.hosts_var, relief=tk.SUNKEN)
+        hosts_entry.grid(row=0, column=1, padx=5, pady=2, sticky="ew", columnspan=3)
+
+        tk.Label(config_frame, text="Port:", anchor="w").grid(row=1, column=0, padx=5, pady=2, sticky="w")
+        port_entry = tk.Entry(config_frame, textvariable=self.port_var, width=8, relief=tk.SUNKEN)
+        port_entry.grid(row=1, column=1, padx=5, pady=2, sticky="w")
+
+        # Keys are looked up in the match profile, then the team profile, then the default one
+        tk.Label(config_frame, text="Team profile:", anchor="w").grid(row=2, column=0, padx=5, pady=2, sticky="w")
+        tk.Entry(config_frame, textvariable=self.team_profile_var, relief=tk.SUNKEN).grid(row=2, column=1, padx=5, pady=2, sticky="ew", columnspan=3)
+
+        tk.Label(config_frame, text="Match profile:", anchor="w").grid(row=3, column=0, padx=5, pady=2, sticky="w")
+        tk.Entry(config_frame, textvariable=self.match_profile_var, relief=tk.SUNKEN).grid(row=3, column=1, padx=5, pady=2, sticky="ew", columnspan=3)
+
+        tk.Label(config_frame, text="Swap layout:", anchor="w").grid(row=4, column=0, padx=5, pady=2, sticky="w")
+        tk.OptionMenu(config_frame, self.swap_layout_var, *sorted(self.swap_layouts)).grid(row=4, column=1, padx=5, pady=2, sticky="w")
+        
+        config_frame.grid_columnconfigure(1, weight=1)
+
+        # Per-host reachability from the background probes
+        self.host_status_label = tk.Label(self.root, text="", anchor="w", padx=15, fg='#475569', font=("Segoe UI", 8))
+        self.host_status_label.pack(fill=tk.X)
+        
+        # --- Control Buttons Frame ---
+        controls_frame = tk.Frame(self.root, padx=10, pady=10)
+        controls_frame.pack(fill=tk.X)
+        
+        # Renamed from "1. Refresh Player List"
+        self.refresh_button = tk.Button(controls_frame, text="Refresh List", command=self.refresh_players, bg='#475569', fg='white', relief=tk.RAISED, activebackground='#64748b')
+        self.refresh_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, ipady=5)
+        
+        # Renamed from "2. Send Binds Live (via Telnet)"
+        self.send_button = tk.Button(controls_frame, text="Send Binds", command=self.send_binds, font=("Segoe UI", 9, "bold"), bg='#10b981', fg='white', relief=tk.RAISED, activebackground='#059669')
+        self.send_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, ipady=5)
+        
+        # Renamed from "3. Halftime Swap (Keys 1-5 <-> 6-0)"
+        self.swap_button = tk.Button(controls_frame, text="Swap", command=self.halftime_swap, font=("Segoe UI", 9, "bold"), bg='#f97316', fg='white', relief=tk.RAISED, activebackground='#ea580c')
+        self.swap_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, ipady=5)
+
+        # Stops a refresh or send that is waiting or in flight (e.g. a host that is hanging)
+        self.cancel_button = tk.Button(controls_frame, text="Cancel", command=self.cancel_operations, bg='#94a3b8', fg='white', relief=tk.RAISED, activebackground='#64748b')
+        self.cancel_button.pack(side=tk.LEFT, fill=tk.X, padx=5, ipady=5)
+        
+        # Sends only changed binds by default; tick this to resend the whole table (e.g. after a game restart)
+        self.full_resync_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.root, text="Force full resync on next send", variable=self.full_resync_var, anchor="w").pack(fill=tk.X, padx=15)
+        
+        # Watch mode keeps the roster live; auto re-bind re-sends binds when a player with a key changes slot
+        watch_frame = tk.Frame(self.root, padx=10)
+        watch_frame.pack(fill=tk.X)
+        self.watch_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(watch_frame, text="Watch roster live", variable=self.watch_var, command=self.toggle_watch).pack(side=tk.LEFT)
+        self.auto_rebind_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(watch_frame, text="Auto re-bind moved players", variable=self.auto_rebind_var).pack(side=tk.LEFT, padx=10)
+        tk.Button(watch_frame, text="Diagnostics", command=self.open_diagnostics, relief=tk.RAISED).pack(side=tk.RIGHT)
+        
+        tk.Label(self.root, text="Current Player Bindings (Enter Key below)", font=("Segoe UI", 10, "bold"), pady=5).pack(fill=tk.X)
+
+        # --- Player List Scrollable Area ---
+        self.player_canvas = tk.Canvas(self.root, borderwidth=0)
+        self.player_canvas.pack(side="left", fill="both", expand=True, padx=10, pady=(0, 5))
+
+        self.scrollbar = tk.Scrollbar(self.root, orient="vertical", command=self.player_canvas.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.player_canvas.configure(yscrollcommand=self.scrollbar.set)
+
+        self.player_frame = tk.Frame(self.player_canvas)
+        self.player_canvas.create_window((0, 0), window=self.player_frame, anchor="nw")
+        
+        self.player_frame.bind("<Configure>", lambda e: self.player_canvas.config(scrollregion=self.player_canvas.bbox("all")))
+        
+        # Headers are drawn once; player rows are added, updated and removed below them
+        tk.Label(self.player_frame, text="Bind Key", font=("Segoe UI", 9, "bold")).grid(row=0, column=0, padx=5, pady=5)
+        tk.Label(self.player_frame, text="Player Name (Slot)", font=("Segoe UI", 10, "bold")).grid(row=0, column=1, padx=5, sticky="w")
+        
+        # Status Bar
+        self.status_label = tk.Label(self.root, text="Set IPs/Port and click 'Refresh'.", bd=1, relief=tk.SUNKEN, anchor=tk.W, padx=10, pady=2, fg='#475569')
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+    
+    def halftime_swap(self):
+        """
+        Performs the rotational swap of the bind keys (1<->6, 2<->7, etc., per the chosen layout) using the pre-staged
+        second-half bind set: the binds are sent live first, then the GUI and saved keys are updated.
+        """
+        started = time.perf_counter()
+        if not self.players:
+             messagebox.showwarning("Swap Failed", "Player list is empty. Please 'Refresh List' first.")
+             return
+        target = self._get_send_target()
+        if target is None:
+            return
+
+        # 1. Use the staged second-half binds, unless keys changed since they were staged
+        staged = self._get_staged_swap()
+
+        # 2. Push them live before touching anything else; a local CS2 only needs to exec the staged cfg
+        self._start_send(*target, staged.bind_map, operation='swap', started=started, staged_cfg=HALFTIME_CFG_NAME)
+
+        # 3. Show the swapped keys in the GUI and save them (both saves are write-behind)
+        with timings.measure('render', operation='swap'):
+            for key_var, new_key in zip(self.key_vars, staged.swapped_keys):
+                if key_var.get().strip() != new_key:
+                    key_var.set(new_key)
+        self._save_keys(staged.swapped_keys)
+        self._save_data() 
+
+        # 4. Update status bar (sampling slots 1 and 6)
+        post_swap_keys = {
+            '1': staged.swapped_keys[self.slot_to_index[1]] if 1 in self.slot_to_index else '',
+            '6': staged.swapped_keys[self.slot_to_index[6]] if 6 in self.slot_to_index else ''
+        }
+        status_text = (
+            f"SWAP SENDING LIVE. Keys rotated: 1->{post_swap_keys['1'] or 'N/A'}, 6->{post_swap_keys['6'] or 'N/A'}."
+        )
+        if staged.warnings:
+            status_text += f" WARNING: {staged.warnings[0]}."
+        self.status_label.config(text=status_text)
+
+    def _current_keys(self):
+        return [key_var.get().strip() for key_var in self.key_vars]
+
+    def _on_key_changed(self, *args):
+        """Re-stages the swap shortly after the last key edit, so typing does not restage on every keystroke."""
+        if self._stage_after_id is not None:
+            self.root.after_cancel(self._stage_after_id)
+        self._stage_after_id = self.root.after(STAGE_DELAY_MS, self._stage_swap)
+
+    def _stage_swap(self):
+        self._stage_after_id = None
+        with timings.measure('stage', operation='swap'):
+            self.staged_swap = stage_halftime_swap(self.players, self._current_keys(),
+                                                   self.swap_layouts[self.swap_layout_var.get()])
+
+        # Write the second half to its own cfg now, so Swap does not render or fsync anything
+        if self.staged_swap.bind_map and any(uses_cfg_delivery(host) for host in self._get_hosts_list()):
+            bind_map = self.staged_swap.bind_map
+            self.commands.submit('stage-cfg', lambda: stage_bind_cfg_async(bind_map, self.pool))
+
+    def _get_staged_swap(self):
+        """Returns the staged swap if it still matches the roster and keys, otherwise stages it now."""
+        staged = self.staged_swap
+        if staged is None or staged.layout != self.swap_layout_var.get() or staged.keys != self._current_keys() or [
+                (p['name'], p['slot']) for p in staged.players] != [(p['name'], p['slot']) for p in self.players]:
+            self._stage_swap()
+            staged = self.staged_swap
+        return staged
+
+    def refresh_players(self):
+        hosts = self._get_hosts_list()
+        
+        if not hosts:
+            messagebox.showerror("Configuration Error", "Please enter at least one Host IP.")
+            return
+
+        try:
+            port = int(self.port_var.get())
+        except ValueError:
+            messagebox.showerror("Configuration Error", "Port must be a valid number.")
+            return
+        
+        self._save_data() 
+        
+        self.status_label.config(text=f"Fetching players from {', '.join(hosts[:REFRESH_MAX_HOSTS])} (port {port})...")
+
+        # Several hosts are asked at once and the first full roster wins.
+        # Clicking again while a refresh is queued just replaces it
+        future = self.commands.submit('refresh', lambda: fetch_players_from_hosts_async(hosts, port, self.pool,
+                                                                                       health=self.health))
+        future.add_done_callback(lambda f: self.root.after(0, self._finish_refresh, f))
+
+    def _finish_refresh(self, future):
+        if future.cancelled():
+            # Superseded by a newer refresh before it started
+            return
+        if isinstance(future.exception(), concurrent.futures.CancelledError):
+            self.status_label.config(text="Refresh cancelled.")
+            return
+        result = future.result()
+        self.populate_player_list(result.players, result.error_message, result.host, result.disagreements)
+
+    def populate_player_list(self, fetched_players, error_message, source_host=None, disagreements=None):
+        """
+        Updates the UI to show *only* connected players (reusing rows that are still valid),
+        and updates the self.players list used by all other functions.
+        """
+        
+        if error_message:
+            messagebox.showerror("Connection/Telnet Error", error_message)
+            self.status_label.config(text="ERROR: Failed to fetch the player list. See error box.")
+            return
+        
+        # 1. Filter out any slots that were returned but have empty names
+        players = normalize_roster(fetched_players)
+
+        # 2. Persistence Load: Look up each player's saved key (by SteamID or normalized name) on the
+        #    database thread; the list is redrawn once the keys are back, in the order lookups were made
+        future = self.roster_db.resolve_keys_future(players, *self._profiles())
+        future.add_done_callback(lambda f: self.root.after(0, self._finish_populate, players, f, source_host, disagreements))
+
+    def _finish_populate(self, players, future, source_host, disagreements):
+        try:
+            keys = future.result()
+        except Exception as e:
+            messagebox.showerror("Roster Database Error", f"Could not look up saved keys: {e}")
+            keys = [''] * len(players)
+
+        # 3. Update the master list used by all other functions
+        self.players = players
+        self.slot_to_index = {p['slot']: i for i, p in enumerate(self.players)}
+        with timings.measure('render', operation='refresh'):
+            self._sync_player_rows(keys)
+
+        active_count = len([p for p in self.players if 1 <= p['slot'] <= 10])
+        spectator_count = len([p for p in self.players if p['slot'] > 10])
+            
+        status_text = f"Successfully fetched {len(self.players)} connected users ({active_count} players, {spectator_count} spectators)"
+        status_text += f" from {source_host}." if source_host else "."
+        if disagreements:
+            # Binds are sent by slot, so a host that sees different slots would spectate the wrong player
+            status_text += f" WARNING: slots differ on {describe_roster_disagreements(disagreements)[0]}"
+        self.status_label.config(text=status_text)
+
+
+    def _sync_player_rows(self, keys):
+        """
+        Brings the player list in line with self.players, filled with 'keys'.
+        Rows are matched by slot, so a refresh only creates, removes or relabels the rows that changed;
+        rosters longer than PLAYER_LIST_VIRTUALIZE_AT are drawn through a small pool of reusable rows.
+        """
+        # Reuse each player's StringVar (and its trace) while they stay connected. Its value is still set to
+        # 'keys', so Refresh shows the saved keys of the selected profiles; callers that must keep keys typed
+        # but not yet sent pass them in 'keys', as the watch updates do
+        vars_by_name = {player['name']: key_var for player, key_var in zip(self._row_players, self.key_vars)}
+        self.key_vars = []
+        for player, key in zip(self.players, keys):
+            key_var = vars_by_name.pop(player['name'], None)
+            if key_var is None:
+                key_var = tk.StringVar()
+                key_var.trace_add('write', self._on_key_changed)
+            if key_var.get() != key:
+                key_var.set(key)
+            self.key_vars.append(key_var)
+        self._row_players = list(self.players)
+        self._on_key_changed()
+
+        if len(self.players) > PLAYER_LIST_VIRTUALIZE_AT:
+            self._clear_slot_rows()
+            self._show_virtual_rows()
+        else:
+            self._clear_virtual_rows()
+            self._update_slot_rows()
+
+    def _update_slot_rows(self):
+        current_slots = {player['slot'] for player in self.players}
+        for slot in [slot for slot in self.player_rows if slot not in current_slots]:
+            entry, label, grid_row = self.player_rows.pop(slot)
+            entry.destroy()
+            label.destroy()
+
+        for i, (player, key_var) in enumerate(zip(self.players, self.key_vars)):
+            label_text = f"{player['name']} (Slot: {player['slot']})"
+            row = self.player_rows.get(player['slot'])
+            if row is None:
+                entry = tk.Entry(self.player_frame, width=8, justify='center', textvariable=key_var)
+                label = tk.Label(self.player_frame, text=label_text, anchor='w')
+                self.player_rows[player['slot']] = [entry, label, None]
+                row = self.player_rows[player['slot']]
+            else:
+                entry, label, grid_row = row
+                if entry.cget('textvariable') != str(key_var):
+                    entry.config(textvariable=key_var)
+                if label.cget('text') != label_text:
+                    label.config(text=label_text)
+
+            # Only rows whose position changed are re-gridded
+            if row[2] != i + 1:
+                entry.grid(row=i + 1, column=0, padx=5, pady=2)
+                label.grid(row=i + 1, column=1, padx=5, sticky="w")
+                row[2] = i + 1
+
+    def _clear_slot_rows(self):
+        for entry, label, grid_row in self.player_rows.values():
+            entry.destroy()
+            label.destroy()
+        self.player_rows.clear()
+
+    def _show_virtual_rows(self):
+        """Draws only VIRTUAL_VISIBLE_ROWS rows and scrolls by swapping which players they show."""
+        if not self.virtual_rows:
+            # The scrollbar now moves through players rather than scrolling the canvas
+            self.player_canvas.yview_moveto(0)
+            self.player_canvas.configure(yscrollcommand='')
+            self.scrollbar.config(command=self._scroll_virtual_rows)
+            for i in range(VIRTUAL_VISIBLE_ROWS):
+                entry = tk.Entry(self.player_frame, width=8, justify='center')
+                label = tk.Label(self.player_frame, anchor='w')
+                entry.grid(row=i + 1, column=0, padx=5, pady=2)
+                label.grid(row=i + 1, column=1, padx=5, sticky="w")
+                for widget in (entry, label, self.player_canvas):
+                    widget.bind("<MouseWheel>", self._on_virtual_mousewheel)
+                    widget.bind("<Button-4>", lambda e: self._scroll_virtual_rows('scroll', -1, 'units'))
+                    widget.bind("<Button-5>", lambda e: self._scroll_virtual_rows('scroll', 1, 'units'))
+                self.virtual_rows.append([entry, label])
+
+        self.virtual_first_index = min(self.virtual_first_index, max(0, len(self.players) - VIRTUAL_VISIBLE_ROWS))
+        self._bind_virtual_rows()
+
+    def _bind_virtual_rows(self):
+        for offset, (entry, label) in enumerate(self.virtual_rows):
+            index = self.virtual_first_index + offset
+            if index < len(self.players):
+                player = self.players[index]
+                entry.config(textvariable=self.key_vars[index], state=tk.NORMAL)
+                label.config(text=f"{player['name']} (Slot: {player['slot']})")
+            else:
+                entry.config(textvariable='', state=tk.DISABLED)
+                label.config(text='')
+
+        total = max(1, len(self.players))
+        self.scrollbar.set(self.virtual_first_index / total,
+                           min(1.0, (self.virtual_first_index + VIRTUAL_VISIBLE_ROWS) / total))
+
+    def _scroll_virtual_rows(self, action, amount, unit=None):
+        """Scrollbar command for the virtual list: 'moveto fraction' or 'scroll n units|pages'."""
+        if action == 'moveto':
+            first_index = int(float(amount) * len(self.players))
+        else:
+            step = VIRTUAL_VISIBLE_ROWS if unit == 'pages' else 1
+            first_index = self.virtual_first_index + int(amount) * step
+
+        first_index = max(0, min(first_index, len(self.players) - VIRTUAL_VISIBLE_ROWS))
+        if first_index != self.virtual_first_index:
+            self.virtual_first_index = first_index
+            self._bind_virtual_rows()
+
+    def _on_virtual_mousewheel(self, event):
+        self._scroll_virtual_rows('scroll', -1 if event.delta > 0 else 1, 'units')
+
+    def _clear_virtual_rows(self):
+        if not self.virtual_rows:
+            return
+        for entry, label in self.virtual_rows:
+            entry.destroy()
+            label.destroy()
+        self.virtual_rows.clear()
+        self.virtual_first_index = 0
+        self.player_canvas.unbind("<MouseWheel>")
+        self.player_canvas.unbind("<Button-4>")
+        self.player_canvas.unbind("<Button-5>")
+        self.player_canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.config(command=self.player_canvas.yview)
+
+    def toggle_watch(self):
+        """Starts or stops the live roster watcher on the first host."""
+        if not self.watch_var.get():
+            self._stop_watch()
+            self.status_label.config(text="Roster watch stopped.")
+            return
+
+        hosts = self._get_hosts_list()
+        try:
+            port = int(self.port_var.get())
+        except ValueError:
+            port = None
+        if not hosts or port is None:
+            messagebox.showerror("Configuration Error", "Please enter at least one Host IP and a valid port.")
+            self.watch_var.set(False)
+            return
+
+        def report_change(players, joined, left, moved):
+            self.root.after(0, self._apply_roster_changes, joined, left, moved)
+
+        def report_error(error_message):
+            self.root.after(0, lambda: self.status_label.config(text=f"WATCH ERROR: {error_message.splitlines()[0]}"))
+
+        watcher = RosterWatcher(self.pool, hosts[0], port, report_change, on_error=report_error, players=self.players)
+        self.watch_future = self.commands.submit('watch', watcher.run)
+        self.status_label.config(text=f"Watching the roster on {hosts[0]}:{port}...")
+
+    def _stop_watch(self):
+        if self.watch_future is not None:
+            self.commands.cancel('watch')
+            self.watch_future = None
+
+    def _apply_roster_changes(self, joined, left, moved):
+        """Applies only the joins, leaves and slot changes reported by the watcher to the player list."""
+        if self.watch_future is None:
+            return
+
+        # Saved keys for the players who joined are looked up on the database thread first
+        future = self.roster_db.resolve_keys_future(joined, *self._profiles())
+        future.add_done_callback(lambda f: self.root.after(0, self._finish_roster_changes, joined, left, moved, f))
+
+    def _finish_roster_changes(self, joined, left, moved, future):
+        if self.watch_future is None:
+            return
+        try:
+            saved_keys = dict(zip([player['name'] for player in joined], future.result()))
+        except Exception:
+            saved_keys = {}
+
+        # Keys typed into the GUI follow their player, even if they were never sent
+        current_keys = {player['name']: key_var.get().strip() for player, key_var in zip(self.players, self.key_vars)}
+        players_by_name = {player['name']: player for player in self.players}
+
+        for player in left:
+            players_by_name.pop(player['name'], None)
+        for old_player, new_player in moved:
+            if new_player['name'] in players_by_name:
+                players_by_name[new_player['name']]['slot'] = new_player['slot']
+        for player in joined:
+            players_by_name.setdefault(player['name'], dict(player))
+
+        self.players = normalize_roster(list(players_by_name.values()))
+        self.slot_to_index = {p['slot']: i for i, p in enumerate(self.players)}
+        keys = [current_keys.get(player['name'], saved_keys.get(player['name'], '')) for player in self.players]
+        with timings.measure('render', operation='watch'):
+            self._sync_player_rows(keys)
+
+        self.status_label.config(text=f"Roster update: {len(joined)} joined, {len(left)} left, {len(moved)} changed slot.")
+
+        # Only players with a key need their bind moved; the diffing send pushes just those binds
+        changed_names = {player['name'] for player in joined} | {new_player['name'] for old_player, new_player in moved}
+        rebind_needed = any(key for player, key in zip(self.players, keys) if player['name'] in changed_names)
+        if self.auto_rebind_var.get() and rebind_needed:
+            self.send_binds()
+
+    def send_binds(self):
+        """Prepares commands, updates persistence, and queues the send on the I/O loop."""
+        if not self.players:
+            messagebox.showwarning("Warning", "Player list is empty. Refresh first.")
+            return
+
+        target = self._get_send_target()
+        if target is None:
+            return
+        
+        keys = self._current_keys()
+
+        # The bind map uses the current Server Slot (player['slot']) and the key in the GUI
+        bind_map = build_bind_map(self.players, keys)
+
+        # Store the updated assignments and settings immediately for persistence
+        self._save_keys(keys)
+        self._save_data()
+        
+        self._start_send(*target, bind_map)
+
+    def cancel_operations(self):
+        """Drops any queued refresh or send and cancels the ones in flight."""
+        self.commands.cancel('refresh')
+        self.commands.cancel('send')
+
+    def _get_send_target(self):
+        """Returns (hosts, port) to send to, or None after telling the user what is missing."""
+        hosts = self._get_hosts_list()
+        if not hosts:
+            messagebox.showerror("Configuration Error", "Please enter at least one Host IP.")
+            return None
+
+        try:
+            port = int(self.port_var.get())
+        except ValueError:
+            messagebox.showerror("Configuration Error", "Port must be a valid number.")
+            return None
+        return hosts, port
+
+    def _start_send(self, hosts, port, bind_map, operation='send', started=None, staged_cfg=None):
+        """
+        Queues the send; a send still waiting for the previous one to finish is replaced by this one.
+        The time from 'started' (default: now) until every host has answered is recorded as the 'live' phase.
+        'staged_cfg' names a cfg already written for this bind map (see stage_bind_cfg_async).
+        """
+        started = time.perf_counter() if started is None else started
+        self.status_label.config(text=f"Sending commands to {len(hosts)} host(s)...")
+        if self.full_resync_var.get():
+            self._resync_requested = True
+            self.full_resync_var.set(False)
+
+        future = self.commands.submit('send', lambda: self._run_async_send(hosts, port, bind_map, operation, started,
+                                                                                staged_cfg))
+        future.add_done_callback(lambda f: self.root.after(0, self._finish_send, f))
+
+    async def _run_async_send(self, hosts, port, bind_map, operation, started, staged_cfg=None):
+        """Runs on the I/O loop: sends to all hosts, reporting each host back to the GUI as it finishes."""
+        finished_results = []
+        full_resync, self._resync_requested = self._resync_requested, False
+
+        # Hosts already known to be down are skipped quietly rather than reported in a warning box
+        known_down = {host for host in hosts if not self.health.allows(host)}
+
+        def report_result(host, success, error_message):
+            finished_results.append((host, success, error_message))
+            elapsed = time.perf_counter() - started
+            if len(finished_results) == len(hosts):
+                timings.record('live', elapsed, operation=operation)
+            self.root.after(0, self._handle_send_completion, list(finished_results), len(hosts), known_down, elapsed)
+
+        with timings.operation(operation, override=True):
+            return await send_bind_commands_to_hosts_async(hosts, port, bind_map, self.pool, on_result=report_result,
+                                                           full_resync=full_resync, health=self.health,
+                                                           staged_cfg=staged_cfg)
+
+    def _finish_send(self, future):
+        # A send superseded before it started needs no report; the newer one will give it
+        if not future.cancelled() and isinstance(future.exception(), concurrent.futures.CancelledError):
+            self.status_label.config(text="Send cancelled. Some binds may not have been applied; use 'Force full resync' to be sure.")
+
+    def _handle_send_completion(self, all_results, total_hosts, known_down=(), elapsed=None):
+        """Called once per finished host with the results so far; finalizes when every host has reported."""
+        failed_hosts = [host for host, success, error in all_results if not success]
+        self._stale_hosts.update(failed_hosts)
+        self._stale_hosts.difference_update(host for host, success, error in all_results if success)
+
+        if len(all_results) < total_hosts:
+            self.status_label.config(text=f"Sending commands... {len(all_results)} of {total_hosts} host(s) done ({len(failed_hosts)} failed).")
+            return
+
+        if not failed_hosts:
+            took = f" in {elapsed * 1000:.0f} ms" if elapsed is not None else ""
+            self.status_label.config(text=f"SUCCESS: Binds live on {total_hosts} CS2 instance(s){took}!")
+        elif set(failed_hosts) <= set(known_down):
+            self.status_label.config(text=f"SENT, except to {len(failed_hosts)} host(s) that are down ({', '.join(failed_hosts)}); they get the binds when they come back.")
+        else:
+            first_fail_message = next((error for host, success, error in all_results if not success and error), "One or more hosts failed to connect.")
+            messagebox.showwarning("Partial Success / Failure", f"Failed to connect to the following hosts: {', '.join(failed_hosts)}\n\nFirst error encountered: {first_fail_message}")
+            self.status_label.config(text=f"FAILED: Binds failed on {len(failed_hosts)} of {len(all_results)} hosts. Check warning box.")
+
+    def open_diagnostics(self):
+        """Opens (or raises) a window with rolling per-phase timing percentiles, updated while it is open."""
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.lift()
+            return
+        self.diagnostics_window = tk.Toplevel(self.root)
+        self.diagnostics_window.title("Diagnostics")
+        self.diagnostics_window.protocol("WM_DELETE_WINDOW", self._close_diagnostics)
+        self.diagnostics_by_host_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.diagnostics_window, text="Per host", variable=self.diagnostics_by_host_var,
+                       command=self._draw_diagnostics, anchor="w").pack(fill=tk.X, padx=5)
+        self.diagnostics_text = tk.Text(self.diagnostics_window, width=86, height=24, font=("Consolas", 9), wrap=tk.NONE)
+        self.diagnostics_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self._draw_diagnostics()
+
+    def _draw_diagnostics(self):
+        if self.diagnostics_window is None:
+            return
+        self.diagnostics_text.config(state=tk.NORMAL)
+        self.diagnostics_text.delete("1.0", tk.END)
+        self.diagnostics_text.insert(tk.END, format_timing_summary(timings.summary(by_host=self.diagnostics_by_host_var.get())))
+        self.diagnostics_text.config(state=tk.DISABLED)
+        if self._diagnostics_after_id is not None:
+            self.root.after_cancel(self._diagnostics_after_id)
+        self._diagnostics_after_id = self.root.after(DIAGNOSTICS_REFRESH_MS, self._draw_diagnostics)
+
+    def _close_diagnostics(self):
+        if self._diagnostics_after_id is not None:
+            self.root.after_cancel(self._diagnostics_after_id)
+            self._diagnostics_after_id = None
+        self.diagnostics_window.destroy()
+        self.diagnostics_window = None
+
+def run_gui():
+    root = tk.Tk()
+    ObserverApp(root)
+    root.mainloop()
+
+if __name__ == "__main__":
+    run_gui()
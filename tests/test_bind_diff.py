@@ -0,0 +1,77 @@
+import asyncio
+
+from fake_netcon import FakeNetconServer
+from observer_binds import NetconPool, diff_bind_commands, send_bind_commands_async
+
+def test_full_resync_sends_every_bind():
+    assert diff_bind_commands(None, {"1": 1, "q": 12}) == [
+        'spec_usenumberkeys_nobinds false',
+        'bind "1" "spec_player 1"',
+        'bind "q" "spec_player 12"',
+    ]
+
+def test_diff_sends_only_changes_and_unbinds_removed_keys():
+    applied = {"1": 1, "2": 2, "3": 3}
+    desired = {"1": 1, "2": 7, "6": 3}
+    assert diff_bind_commands(applied, desired) == [
+        'unbind "3"',
+        'bind "2" "spec_player 7"',
+        'bind "6" "spec_player 3"',
+    ]
+
+def test_diff_of_unchanged_binds_is_empty():
+    assert diff_bind_commands({"1": 1}, {"1": 1}) == []
+
+def test_send_applies_diffs_and_full_resync_on_fake_server():
+    async def run():
+        async with FakeNetconServer(split_size=5) as server:
+            pool = NetconPool(timeout=5)
+            try:
+                send = lambda bind_map, **kwargs: send_bind_commands_async(
+                    server.host, server.port, bind_map, pool, delivery_mode="telnet", **kwargs)
+                assert await send({"1": 1, "2": 2, "3": 3}) == (True, None)
+
+                assert await send({"1": 1, "2": 7}) == (True, None)
+                assert server.binds == {"1": "spec_player 1", "2": "spec_player 7"}
+
+                # Nothing changed: nothing is sent
+                count = server.command_count
+                assert await send({"1": 1, "2": 7}) == (True, None)
+                assert server.command_count == count
+
+                # A resync resends everything even though the cache says it is applied
+                server.binds.clear()
+                assert await send({"1": 1, "2": 7}, full_resync=True) == (True, None)
+                assert server.binds == {"1": "spec_player 1", "2": "spec_player 7"}
+            finally:
+                await pool.close_all()
+
+    asyncio.run(run())
+
+def test_reconnect_during_a_diff_resends_the_full_set():
+    async def run():
+        async with FakeNetconServer() as server:
+            pool = NetconPool(timeout=5)
+            session = pool.get(server.host, server.port)
+            try:
+                await send_bind_commands_async(server.host, server.port, {"1": 1, "2": 2}, pool, delivery_mode="telnet")
+
+                # The game restarts and the socket is found stale only once the diff is being written
+                server.binds.clear()
+                discard_inbox = session._discard_inbox
+
+                def stale_once():
+                    session._discard_inbox = discard_inbox
+                    raise ConnectionResetError("stale")
+
+                session._discard_inbox = stale_once
+                result = await send_bind_commands_async(server.host, server.port, {"1": 1, "2": 7}, pool,
+                                                        delivery_mode="telnet")
+                return result, dict(server.binds), session.applied_binds
+            finally:
+                await pool.close_all()
+
+    result, binds, applied_binds = asyncio.run(run())
+    assert result == (True, None)
+    assert binds == {"1": "spec_player 1", "2": "spec_player 7"}
+    assert applied_binds == {"1": 1, "2": 7}
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+import observer_binds
+from fake_netcon import FakeNetconServer
+from observer_binds import GENERATED_CFG_NAME, NetconPool, render_bind_cfg, send_bind_commands_async, uses_cfg_delivery
+
+@pytest.fixture
+def cfg_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(observer_binds, "CS2_CFG_PATH", str(tmp_path))
+    return tmp_path
+
+class RecordingServer(FakeNetconServer):
+    """Remembers every console command it ran, including those run from a cfg."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commands = []
+
+    def run_command(self, command):
+        self.commands.append(command)
+        return super().run_command(command)
+
+def send_all(server, bind_maps, **kwargs):
+    async def run():
+        async with server:
+            pool = NetconPool(timeout=5)
+            try:
+                return [await send_bind_commands_async(server.host, server.port, bind_map, pool, **kwargs)
+                        for bind_map in bind_maps]
+            finally:
+                await pool.close_all()
+
+    return asyncio.run(run())
+
+def test_cfg_delivery_is_only_for_a_local_cs2(cfg_dir, monkeypatch):
+    assert uses_cfg_delivery("127.0.0.1")
+    assert not uses_cfg_delivery("192.168.1.20")
+    assert not uses_cfg_delivery("127.0.0.1", "telnet")
+    monkeypatch.setattr(observer_binds, "CS2_CFG_PATH", str(cfg_dir / "missing"))
+    assert not uses_cfg_delivery("127.0.0.1")
+
+def test_render_bind_cfg_puts_one_command_per_line():
+    assert render_bind_cfg(['bind "1" "spec_player 1"', 'unbind "2"']).splitlines()[1:] == [
+        'bind "1" "spec_player 1"', 'unbind "2"']
+
+def test_local_host_gets_the_full_set_through_one_exec(cfg_dir):
+    server = RecordingServer(cfg_dir=str(cfg_dir))
+    results = send_all(server, [{"1": 1, "2": 2, "3": 3}, {"1": 1, "2": 7}])
+    assert results == [(True, None), (True, None)]
+    assert server.binds == {"1": "spec_player 1", "2": "spec_player 7"}
+
+    # The console itself only ever saw the exec and the reply markers
+    typed = [command for command in server.commands if not command.startswith("echo")]
+    assert typed.count("exec observer_binds_generated") == 2
+    cfg = (cfg_dir / GENERATED_CFG_NAME).read_text()
+    # The file holds the whole set (so it can be exec'd by hand) plus the unbind for the removed key
+    assert 'unbind "3"' in cfg and 'bind "1" "spec_player 1"' in cfg and 'bind "2" "spec_player 7"' in cfg
+    assert [p.name for p in cfg_dir.iterdir()] == [GENERATED_CFG_NAME]
+
+def test_remote_host_gets_binds_over_telnet(cfg_dir):
+    server = RecordingServer(host="127.0.0.2", cfg_dir=str(cfg_dir))
+    assert send_all(server, [{"1": 1}]) == [(True, None)]
+    assert server.binds == {"1": "spec_player 1"}
+    assert 'bind "1" "spec_player 1"' in server.commands
+    assert not (cfg_dir / GENERATED_CFG_NAME).exists()
@@ -0,0 +1,80 @@
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from fake_netcon import FakeNetconServer
+from observer_binds import BackgroundLoop, CommandQueue, NetconPool, send_bind_commands_to_hosts_async
+
+@pytest.fixture
+def io_loop():
+    io_loop = BackgroundLoop()
+    yield io_loop
+    io_loop.stop()
+
+def test_command_queue_replaces_a_waiting_operation(io_loop):
+    commands = CommandQueue(io_loop)
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    async def operation(name):
+        ran.append(name)
+        if name == "first":
+            started.set()
+            await asyncio.to_thread(release.wait, 5)
+        return name
+
+    first = commands.submit("send", lambda: operation("first"))
+    assert started.wait(5)
+    second = commands.submit("send", lambda: operation("second"))
+    third = commands.submit("send", lambda: operation("third"))
+    release.set()
+
+    assert first.result(timeout=5) == "first"
+    assert third.result(timeout=5) == "third"
+    assert second.cancelled()
+    assert ran == ["first", "third"]
+    commands.close()
+
+def test_command_queue_cancel_stops_running_and_waiting(io_loop):
+    commands = CommandQueue(io_loop)
+    started = threading.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(30)
+
+    running = commands.submit("refresh", hang)
+    assert started.wait(5)
+    waiting = commands.submit("refresh", hang)
+    other = commands.submit("send", lambda: asyncio.sleep(0, result="sent"))
+    commands.cancel("refresh")
+
+    assert isinstance(running.exception(timeout=5), concurrent.futures.CancelledError)
+    assert waiting.cancelled()
+    # Other lanes are left alone
+    assert other.result(timeout=5) == "sent"
+    commands.close()
+
+def test_cancelled_send_resets_the_diff_cache(io_loop):
+    server = FakeNetconServer(latency=0.2)
+    io_loop.run(server.start())
+    pool = NetconPool(timeout=5)
+    commands = CommandQueue(io_loop)
+    try:
+        first = commands.submit("send", lambda: send_bind_commands_to_hosts_async(
+            [server.host], server.port, {"1": 1}, pool, delivery_mode="telnet"))
+        assert first.result(timeout=5)[0][1]
+
+        cancelled = commands.submit("send", lambda: send_bind_commands_to_hosts_async(
+            [server.host], server.port, {"1": 2}, pool, delivery_mode="telnet"))
+        # Cancel while the host is still answering
+        io_loop.run(asyncio.sleep(0.1))
+        commands.cancel("send")
+        assert isinstance(cancelled.exception(timeout=5), concurrent.futures.CancelledError)
+        assert pool.get(server.host, server.port).applied_binds is None
+    finally:
+        commands.close()
+        io_loop.run(pool.close_all())
+        io_loop.run(server.stop())
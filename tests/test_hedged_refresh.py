@@ -0,0 +1,94 @@
+import asyncio
+import contextlib
+
+from fake_netcon import FakeNetconServer
+from observer_binds import (
+    HostHealth, NetconPool, describe_roster_disagreements, fetch_players_from_hosts_async, send_bind_commands_async,
+)
+
+@contextlib.asynccontextmanager
+async def servers(*latencies, roster_size=4):
+    """Fake hosts on 127.0.0.1, 127.0.0.2, ... sharing one port, like observer PCs on a LAN."""
+    started = []
+    try:
+        port = 0
+        for index, latency in enumerate(latencies):
+            server = await FakeNetconServer(f"127.0.0.{index + 1}", port, roster_size, latency).start()
+            port = server.port
+            started.append(server)
+        yield started
+    finally:
+        for server in started:
+            await server.stop()
+
+def test_fastest_full_roster_wins_and_slow_hosts_keep_their_sessions():
+    async def run():
+        async with servers(0.4, 0.0) as (slow, fast):
+            pool = NetconPool(timeout=3)
+            try:
+                await send_bind_commands_async(slow.host, slow.port, {"1": 1}, pool, delivery_mode="telnet")
+                slow_session = pool.get(slow.host, slow.port)
+                connections = slow.connection_count
+
+                result = await fetch_players_from_hosts_async([slow.host, fast.host], fast.port, pool,
+                                                              agreement_window=0.05)
+                detached = len(pool._detached)
+                await asyncio.sleep(1.0)
+                return (result, detached, len(pool._detached), slow_session.connected,
+                        slow_session.applied_binds, slow.connection_count - connections)
+            finally:
+                await pool.close_all()
+
+    result, detached, still_detached, connected, applied_binds, new_connections = asyncio.run(run())
+    assert result.host == "127.0.0.2" and result.error_message is None
+    assert len(result.players) == 4 and result.disagreements == {}
+    # The slow host was left to finish: same socket, diff cache intact
+    assert detached == 1 and still_detached == 0
+    assert connected and applied_binds == {"1": 1} and new_connections == 0
+
+def test_hosts_answering_within_the_window_are_compared():
+    async def run():
+        async with servers(0.0, 0.0) as (first, second):
+            second.roster[0], second.roster[1] = second.roster[1], second.roster[0]
+            pool = NetconPool(timeout=3)
+            try:
+                return await fetch_players_from_hosts_async([first.host, second.host], first.port, pool,
+                                                            agreement_window=0.5)
+            finally:
+                await pool.close_all()
+
+    result = asyncio.run(run())
+    assert result.host == "127.0.0.1"
+    joined, left, moved = result.disagreements["127.0.0.2"]
+    assert joined == [] and left == []
+    assert sorted((old["slot"], new["slot"]) for old, new in moved) == [(1, 2), (2, 1)]
+    assert "127.0.0.2" in describe_roster_disagreements(result.disagreements)[0]
+
+def test_failed_hosts_are_skipped_and_recorded():
+    async def run():
+        async with servers(0.0) as (alive,):
+            pool = NetconPool(timeout=1)
+            health = HostHealth(pool)
+            try:
+                # Nothing listens on 127.0.0.9
+                result = await fetch_players_from_hosts_async(["127.0.0.9", alive.host], alive.port, pool,
+                                                              health=health)
+                return result, health.status("127.0.0.9")["last_error"], health.status(alive.host)["state"]
+            finally:
+                await pool.close_all()
+
+    result, dead_error, alive_state = asyncio.run(run())
+    assert result.host == "127.0.0.1" and len(result.players) == 4
+    assert dead_error and alive_state == "up"
+
+def test_error_when_no_host_answers():
+    async def run():
+        pool = NetconPool(timeout=1)
+        try:
+            return await fetch_players_from_hosts_async(["127.0.0.8", "127.0.0.9"], 1, pool)
+        finally:
+            await pool.close_all()
+
+    result = asyncio.run(run())
+    assert result.players == [] and result.host is None
+    assert result.error_message.startswith("None of 2 hosts returned a roster.")
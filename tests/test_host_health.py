@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import pytest
+
+import observer_binds
+from fake_netcon import FakeNetconServer
+from observer_binds import (
+    BREAKER_COOLDOWN_INITIAL, BREAKER_COOLDOWN_MAX, BREAKER_FAILURE_THRESHOLD, HostHealth, NetconPool,
+    send_bind_commands_async, send_bind_commands_to_hosts_async,
+)
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(observer_binds.time, "monotonic", lambda: now[0])
+    return now
+
+def test_breaker_opens_after_the_threshold_and_backs_off(clock):
+    health = HostHealth(pool=None)
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        health.record_failure("a", "refused")
+    assert health.status("a")["state"] != "down"
+    assert health.allows("a")
+
+    health.record_failure("a", "refused\nmore detail")
+    assert health.status("a") == {"state": "down", "rtt": None, "last_error": "refused",
+                                  "retry_in": BREAKER_COOLDOWN_INITIAL}
+    assert not health.allows("a")
+
+    # After the cooldown one trial is allowed; failing it doubles the cooldown
+    clock[0] += BREAKER_COOLDOWN_INITIAL
+    assert health.allows("a")
+    health.record_failure("a", "refused")
+    assert health.status("a")["retry_in"] == BREAKER_COOLDOWN_INITIAL * 2
+
+    for _ in range(10):
+        health.record_failure("a", "refused")
+    assert health.status("a")["retry_in"] == BREAKER_COOLDOWN_MAX
+
+    health.record_success("a", rtt=0.01)
+    assert health.status("a")["state"] == "up"
+    health.record_failure("a", "refused")
+    assert health.allows("a")
+
+def test_rank_drops_down_hosts_and_puts_the_fastest_first(clock):
+    health = HostHealth(pool=None)
+    health.record_success("slow", rtt=0.2)
+    health.record_success("fast", rtt=0.01)
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        health.record_failure("dead", "refused")
+    assert health.rank(["new", "slow", "dead", "fast"]) == ["fast", "slow", "new"]
+
+def test_send_skips_a_down_host_without_contacting_it():
+    async def run():
+        async with FakeNetconServer() as server:
+            pool = NetconPool(timeout=2)
+            health = HostHealth(pool)
+            for _ in range(BREAKER_FAILURE_THRESHOLD):
+                health.record_failure(server.host, "refused")
+            try:
+                results = await send_bind_commands_to_hosts_async([server.host], server.port, {"1": 1}, pool,
+                                                                  delivery_mode="telnet", health=health)
+            finally:
+                await pool.close_all()
+            return results, server.connection_count
+
+    [(host, success, error_message)], connection_count = asyncio.run(run())
+    assert not success and "Skipped" in error_message
+    assert connection_count == 0
+
+def test_probe_records_round_trip_and_failure():
+    async def run():
+        async with FakeNetconServer() as server:
+            pool = NetconPool(timeout=2)
+            health = HostHealth(pool, probe_timeout=2)
+            try:
+                await health.probe(server.host, server.port)
+                up = health.status(server.host)
+                await server.stop()
+                await pool.close_all()
+                for _ in range(BREAKER_FAILURE_THRESHOLD):
+                    await health.probe(server.host, server.port)
+                return up, health.status(server.host)
+            finally:
+                await pool.close_all()
+
+    up, down = asyncio.run(run())
+    assert up["state"] == "up" and up["rtt"] > 0
+    assert down["state"] == "down"
+
+def test_probe_leaves_a_busy_session_alone():
+    async def run():
+        async with FakeNetconServer(latency=0.3) as server:
+            pool = NetconPool(timeout=2)
+            health = HostHealth(pool)
+            session = pool.get(server.host, server.port)
+            try:
+                request = asyncio.ensure_future(session.request("echo busy"))
+                await asyncio.sleep(0.1)
+                started = time.perf_counter()
+                await health.probe(server.host, server.port)
+                probe_took = time.perf_counter() - started
+                await request
+                return probe_took, health.status(server.host)["state"]
+            finally:
+                await pool.close_all()
+
+    probe_took, state = asyncio.run(run())
+    assert probe_took < 0.1
+    assert state == "unknown"
+
+def test_send_timeout_includes_waiting_for_a_busy_session():
+    async def run():
+        async with FakeNetconServer(latency=1.0) as server:
+            pool = NetconPool(timeout=3)
+            session = pool.get(server.host, server.port)
+            try:
+                # Something else (e.g. a refresh left to finish) is using the session for a second
+                other = asyncio.ensure_future(session.request([], timeout=3))
+                await asyncio.sleep(0.1)
+                started = time.perf_counter()
+                result = await send_bind_commands_async(server.host, server.port, {"1": 1}, pool,
+                                                        timeout=0.3, delivery_mode="telnet")
+                took = time.perf_counter() - started
+                # Giving up while waiting did not close the session under the other request
+                await other
+                return result, took
+            finally:
+                await pool.close_all()
+
+    (success, error_message), took = asyncio.run(run())
+    assert not success and "Timed out" in error_message
+    assert took < 0.8
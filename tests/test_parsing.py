@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from fake_netcon import FakeNetconServer
+from observer_binds import ConsoleLineBuffer, NetconPool, RosterParser, fetch_players_async
+
+VOICE_OUTPUT = "  0 Player 1\n  1 [TAG] Player 2\n 11 Caster Bob\n"
+STATUS_OUTPUT = (
+    "hostname: test\n"
+    "---------players--------\n"
+    "  id     time ping loss      state   rate adr name\n"
+    "     0    00:42   12    0     active 786432 127.0.0.1:27005 'Player 1'\n"
+    "     4    00:42   12    0     active 786432 127.0.0.1:27005 'Caster Bob'\n"
+    "#end\n"
+)
+
+def feed_in_chunks(parser, text, size):
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    parser.close()
+    return parser.players
+
+def test_line_buffer_joins_lines_split_across_chunks():
+    buffer = ConsoleLineBuffer()
+    assert buffer.feed("ab") == []
+    assert buffer.feed("c\r\nde") == ["abc"]
+    assert buffer.feed("f\n\ng") == ["def", ""]
+    assert buffer.flush() == "g"
+    assert buffer.flush() == ""
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_voice_show_mute_parses_the_same_whatever_the_chunk_size(size):
+    assert feed_in_chunks(RosterParser("voice_show_mute"), VOICE_OUTPUT, size) == [
+        {"name": "Player 1", "slot": 1},
+        {"name": "[TAG] Player 2", "slot": 2},
+        {"name": "Caster Bob", "slot": 12},
+    ]
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_status_only_reads_the_player_table(size):
+    players = feed_in_chunks(RosterParser("status"), STATUS_OUTPUT, size)
+    assert [(player["name"], player["slot"]) for player in players] == [("Player 1", 1), ("Caster Bob", 5)]
+
+def test_last_line_without_newline_is_parsed_on_close():
+    parser = RosterParser("voice_show_mute")
+    assert parser.feed("  2 Late") == []
+    assert parser.close() == [{"name": "Late", "slot": 3}]
+
+def test_unknown_source_is_rejected():
+    with pytest.raises(ValueError):
+        RosterParser("users")
+
+@pytest.mark.parametrize("source", ["voice_show_mute", "status"])
+@pytest.mark.parametrize("split_size", [1, 3, 16])
+def test_fetch_from_fake_server_with_fragmented_replies(source, split_size):
+    async def fetch():
+        async with FakeNetconServer(roster_size=12, split_size=split_size) as server:
+            pool = NetconPool(timeout=5)
+            try:
+                return await fetch_players_async(server.host, server.port, pool, source)
+            finally:
+                await pool.close_all()
+
+    players, error_message = asyncio.run(fetch())
+    assert error_message is None
+    assert [(player["name"], player["slot"]) for player in players] == [
+        (f"Player {slot}", slot) for slot in range(1, 13)]
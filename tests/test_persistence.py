@@ -0,0 +1,53 @@
+import json
+import time
+
+from observer_binds import DataStore, load_data, save_data
+
+def test_save_data_round_trips_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "settings.json"
+    save_data({"hosts": "127.0.0.1", "port": 2020, "team_profile": "A"}, str(path))
+    assert load_data(str(path))["team_profile"] == "A"
+    assert [p.name for p in tmp_path.iterdir()] == ["settings.json"]
+
+def test_load_data_falls_back_on_a_broken_file(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text("{not json")
+    assert set(load_data(str(path))) == {"hosts", "port"}
+
+def test_burst_of_saves_is_written_once_after_the_debounce(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    writes = []
+    monkeypatch.setattr("observer_binds.save_data", lambda data, path: writes.append(data))
+    store = DataStore(str(path), debounce=0.2)
+    try:
+        data = {"hosts": "a"}
+        for hosts in ("a", "b", "c"):
+            data["hosts"] = hosts
+            store.save(data)
+        # save() took a snapshot, so later changes to the dict are not written
+        data["hosts"] = "changed after save"
+        assert writes == []
+        time.sleep(0.5)
+        assert writes == [{"hosts": "c"}]
+    finally:
+        store.close()
+
+def test_flush_writes_immediately_and_close_writes_the_rest(tmp_path):
+    path = tmp_path / "settings.json"
+    store = DataStore(str(path), debounce=30)
+    store.save({"hosts": "flushed"})
+    store.flush()
+    assert json.loads(path.read_text()) == {"hosts": "flushed"}
+
+    store.save({"hosts": "on close"})
+    started = time.perf_counter()
+    store.close()
+    assert time.perf_counter() - started < 5
+    assert json.loads(path.read_text()) == {"hosts": "on close"}
+
+def test_write_errors_are_reported(tmp_path):
+    errors = []
+    store = DataStore(str(tmp_path / "missing" / "settings.json"), debounce=0, on_error=errors.append)
+    store.save({"hosts": "x"})
+    store.close()
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
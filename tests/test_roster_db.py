@@ -0,0 +1,87 @@
+import pytest
+
+from observer_binds import RosterDB, migrate_json_bindings, normalize_player_name
+
+@pytest.fixture
+def roster_db(tmp_path):
+    roster_db = RosterDB(str(tmp_path / "roster.db"))
+    yield roster_db
+    roster_db.close()
+
+def save(roster_db, players, keys, *profiles):
+    roster_db.save_keys(players, keys, *profiles).result()
+
+def test_name_normalization_ignores_clan_tags_and_symbols():
+    assert normalize_player_name("[NEW] Player") == normalize_player_name("OLD | player") == "player"
+    assert normalize_player_name("  ***  ") == "***"
+    # A name before a '|' is not a clan tag
+    assert normalize_player_name("Bob | TeamX") != normalize_player_name("Alice | TeamX")
+
+def test_steamid_keeps_the_key_across_renames(roster_db):
+    save(roster_db, [{"name": "Old Name", "steamid": "STEAM_1:0:1"}], ["3"])
+    assert roster_db.resolve_keys([{"name": "Completely New", "steamid": "STEAM_1:0:1"}]) == ["3"]
+
+def test_name_fallback_follows_a_clan_tag_change(roster_db):
+    save(roster_db, [{"name": "[OLD] Player"}], ["4"])
+    assert roster_db.resolve_keys([{"name": "NEW | player"}, {"name": "Someone"}]) == ["4", ""]
+
+def test_players_sharing_a_suffix_tag_keep_their_own_keys(roster_db):
+    bob, alice = {"name": "Bob | TeamX"}, {"name": "Alice | TeamX"}
+    save(roster_db, [bob, alice], ["1", "2"])
+    assert roster_db.resolve_keys([bob, alice]) == ["1", "2"]
+
+def test_two_players_in_one_roster_never_share_a_row(roster_db):
+    # Both normalize to "player"; the exact name wins and the other one gets a row of its own
+    save(roster_db, [{"name": "Player"}], ["1"])
+    save(roster_db, [{"name": "[A] Player"}, {"name": "Player"}], ["3", "1"])
+    assert roster_db.resolve_keys([{"name": "Player"}, {"name": "[A] Player"}]) == ["1", "3"]
+
+def test_players_with_different_steamids_never_share_a_key(roster_db):
+    save(roster_db, [{"name": "player", "steamid": "STEAM_1:0:1"}], ["1"])
+    save(roster_db, [{"name": "[X] Player", "steamid": "STEAM_1:0:2"}], ["6"])
+    assert roster_db.resolve_keys([{"name": "player", "steamid": "STEAM_1:0:1"},
+                                   {"name": "[X] Player", "steamid": "STEAM_1:0:2"}]) == ["1", "6"]
+
+def test_name_row_without_steamid_is_claimed_by_the_steamid(roster_db):
+    save(roster_db, [{"name": "Player"}], ["2"])
+    assert roster_db.resolve_keys([{"name": "Player", "steamid": "STEAM_1:0:5"}]) == ["2"]
+    save(roster_db, [{"name": "Player", "steamid": "STEAM_1:0:5"}], ["7"])
+    # The old row now belongs to that SteamID, so another SteamID with the same name starts empty
+    assert roster_db.resolve_keys([{"name": "Renamed", "steamid": "STEAM_1:0:5"},
+                                   {"name": "Player", "steamid": "STEAM_1:0:6"}]) == ["7", ""]
+
+def test_keys_fall_back_from_match_to_team_to_default(roster_db):
+    alice, bob, carol = {"name": "Alice"}, {"name": "Bob"}, {"name": "Carol"}
+    save(roster_db, [alice, bob, carol], ["1", "2", "3"])
+    save(roster_db, [bob, carol], ["7", "8"], "Team A")
+    save(roster_db, [carol], ["9"], "Team A", "Final")
+
+    assert roster_db.resolve_keys([alice, bob, carol]) == ["1", "2", "3"]
+    assert roster_db.resolve_keys([alice, bob, carol], "Team A") == ["1", "7", "8"]
+    assert roster_db.resolve_keys([alice, bob, carol], "Team A", "Final") == ["1", "7", "9"]
+    # An unknown profile falls through to the ones that exist
+    assert roster_db.resolve_keys([alice, bob, carol], "Team B", "Final") == ["1", "2", "9"]
+
+def test_cleared_key_overrides_the_fallback(roster_db):
+    player = {"name": "Alice", "steamid": "STEAM_1:0:1"}
+    save(roster_db, [player], ["1"], "Team A")
+    save(roster_db, [player], [""], "Team A", "Final")
+    assert roster_db.resolve_keys([player], "Team A", "Final") == [""]
+    assert roster_db.resolve_keys([player], "Team A") == ["1"]
+
+def test_migration_moves_json_bindings_into_the_database(roster_db):
+    data = {"hosts": "127.0.0.1", "bindings": {"Alice": "1", "Bob": "2"}}
+    assert migrate_json_bindings(data, roster_db)
+    assert "bindings" not in data
+    assert roster_db.resolve_keys([{"name": "Alice"}, {"name": "Bob"}]) == ["1", "2"]
+    assert not migrate_json_bindings(data, roster_db)
+
+def test_failed_migration_keeps_the_json_bindings(tmp_path):
+    roster_db = RosterDB(str(tmp_path / "missing" / "roster.db"))
+    data = {"bindings": {"Alice": "1"}}
+    try:
+        with pytest.raises(Exception):
+            migrate_json_bindings(data, roster_db)
+    finally:
+        roster_db.close()
+    assert data == {"bindings": {"Alice": "1"}}
@@ -0,0 +1,59 @@
+import asyncio
+
+from fake_netcon import FakeNetconServer
+from observer_binds import ROSTER_EVENT_PATTERN, NetconPool, RosterWatcher
+
+class CountingServer(FakeNetconServer):
+    """Counts roster reads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.roster_reads = 0
+
+    def run_command(self, command):
+        if command.startswith("voice_show_mute"):
+            self.roster_reads += 1
+        return super().run_command(command)
+
+def test_event_pattern_matches_only_join_and_leave_messages():
+    assert ROSTER_EVENT_PATTERN.search('Client "New Guy" connected (127.0.0.1:27005).')
+    assert ROSTER_EVENT_PATTERN.search("Dropped New Guy from server: Disconnect")
+    assert not ROSTER_EVENT_PATTERN.search("  3 Dropped Frames")
+    assert not ROSTER_EVENT_PATTERN.search("  4 disconnected connected")
+
+def watch(server, seconds, during=None):
+    """Runs a RosterWatcher against 'server' for about 'seconds' and returns its on_change calls."""
+    async def run():
+        async with server:
+            pool = NetconPool(timeout=2)
+            changes = []
+            watcher = RosterWatcher(pool, server.host, server.port, poll_interval=5,
+                                    on_change=lambda *change: changes.append(change))
+            task = asyncio.ensure_future(watcher.run())
+            try:
+                await asyncio.sleep(0.3)
+                if during:
+                    during()
+                await asyncio.sleep(seconds)
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await pool.close_all()
+            return changes
+
+    return asyncio.run(run())
+
+def test_join_is_reported_without_waiting_for_the_poll():
+    server = CountingServer(roster_size=2)
+    changes = watch(server, 0.6, during=lambda: server.add_player("New Guy"))
+    # The first check reports the starting roster; the join follows well before the 5 s poll
+    players, joined, left, moved = changes[-1]
+    assert [player["name"] for player in joined] == ["New Guy"]
+    assert len(players) == 3
+
+def test_player_names_in_roster_replies_do_not_trigger_checks():
+    server = CountingServer(roster_size=2)
+    server.roster[2] = "Dropped Frames"
+    server.roster[3] = "Client \"x\" connected"
+    watch(server, 1.5)
+    assert server.roster_reads == 1
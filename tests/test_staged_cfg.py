@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import observer_binds
+from fake_netcon import FakeNetconServer
+from observer_binds import GENERATED_CFG_NAME, HALFTIME_CFG_NAME, NetconPool, send_bind_commands_async, stage_bind_cfg_async
+
+FIRST_HALF = {"1": 1, "2": 2, "3": 3}
+SECOND_HALF = {"6": 1, "7": 2, "8": 3}
+
+@pytest.fixture
+def cfg_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(observer_binds, "CS2_CFG_PATH", str(tmp_path))
+    return tmp_path
+
+def swap(cfg_dir, staged_map, sent_map):
+    """Sends FIRST_HALF, stages 'staged_map', then sends 'sent_map' with staged_cfg set."""
+    async def run():
+        async with FakeNetconServer(cfg_dir=str(cfg_dir)) as server:
+            pool = NetconPool(timeout=5)
+            try:
+                assert await send_bind_commands_async(server.host, server.port, FIRST_HALF, pool) == (True, None)
+                assert await stage_bind_cfg_async(staged_map, pool)
+                staged = dict(pool.staged_cfgs)
+                (cfg_dir / GENERATED_CFG_NAME).unlink()
+                result = await send_bind_commands_async(server.host, server.port, sent_map, pool,
+                                                        staged_cfg=HALFTIME_CFG_NAME)
+                return result, staged, server.binds, pool.get(server.host, server.port).applied_binds
+            finally:
+                await pool.close_all()
+
+    return asyncio.run(run())
+
+def test_staged_cfg_is_only_exec_d_at_halftime(cfg_dir):
+    result, staged, binds, applied_binds = swap(cfg_dir, SECOND_HALF, SECOND_HALF)
+    assert result == (True, None)
+    assert staged == {HALFTIME_CFG_NAME: SECOND_HALF}
+    assert 'bind "6" "spec_player 1"' in (cfg_dir / HALFTIME_CFG_NAME).read_text()
+    # Nothing was written on the way: the generated cfg is not recreated
+    assert not (cfg_dir / GENERATED_CFG_NAME).exists()
+    # The first-half keys were unbound alongside the exec
+    assert binds == {"6": "spec_player 1", "7": "spec_player 2", "8": "spec_player 3"}
+    assert applied_binds == SECOND_HALF
+
+def test_changed_map_falls_back_to_the_generated_cfg(cfg_dir):
+    changed = {**SECOND_HALF, "8": 4}
+    result, _, binds, applied_binds = swap(cfg_dir, SECOND_HALF, changed)
+    assert result == (True, None)
+    assert (cfg_dir / GENERATED_CFG_NAME).exists()
+    assert binds == {"6": "spec_player 1", "7": "spec_player 2", "8": "spec_player 4"}
+    assert applied_binds == changed
+
+def test_staging_needs_a_local_cfg_folder(cfg_dir, monkeypatch):
+    monkeypatch.setattr(observer_binds, "CS2_CFG_PATH", str(cfg_dir / "missing"))
+    pool = NetconPool()
+    assert not asyncio.run(stage_bind_cfg_async(SECOND_HALF, pool))
+    assert pool.staged_cfgs == {}
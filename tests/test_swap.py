@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from observer_binds import SwapLayout, load_swap_layouts, stage_halftime_swap, swap_keys
+
+def roster(*names):
+    return [{"name": name, "slot": slot} for slot, name in enumerate(names, start=1)]
+
+def test_standard_layout_rotates_both_halves():
+    layout = SwapLayout("standard", [["1", "2", "3", "4", "5"], ["6", "7", "8", "9", "0"]])
+    assert [layout.swap(key) for key in "1234567890"] == list("6789012345")
+    # Keys outside the layout are kept
+    assert layout.swap("q") == "q"
+    assert layout.swap("") == ""
+
+def test_multi_step_rotation_over_three_groups():
+    one_step = SwapLayout("tri", [["1", "2"], ["3", "4"], ["5", "6"]])
+    two_steps = SwapLayout("tri", [["1", "2"], ["3", "4"], ["5", "6"]], steps=2)
+    assert [one_step.swap(key) for key in "123456"] == list("345612")
+    assert [two_steps.swap(key) for key in "123456"] == list("561234")
+    # Three single steps come back round to the start
+    assert [one_step.swap(one_step.swap(one_step.swap(key))) for key in "123456"] == list("123456")
+
+def test_layout_keys_are_case_insensitive():
+    layout = SwapLayout.from_definition("letters", {"groups": [["Q"], ["e"]]})
+    assert layout.swap("q") == "e"
+    assert layout.swap("E") == "Q"
+
+@pytest.mark.parametrize("groups, message", [
+    ([["1", "2"]], "at least two"),
+    ([["1", "2"], ["3"]], "different sizes"),
+    ([["1", "2"], ["2", "3"]], "more than once"),
+    ([["a"], ["A"]], "more than once"),
+])
+def test_invalid_layouts_are_rejected(groups, message):
+    with pytest.raises(ValueError, match=message):
+        SwapLayout("bad", groups)
+
+def test_custom_layouts_file_skips_invalid_entries(tmp_path):
+    path = tmp_path / "layouts.json"
+    path.write_text(json.dumps({
+        "tri": {"groups": [["1"], ["2"], ["3"]], "steps": 2},
+        "broken": {"groups": [["1", "2"], ["3"]]},
+        "not_a_layout": ["1", "6"],
+    }))
+    layouts, errors = load_swap_layouts(str(path))
+    assert layouts["tri"].table == {"1": "3", "2": "1", "3": "2"}
+    assert "standard" in layouts
+    assert "broken" not in layouts and "not_a_layout" not in layouts
+    assert len(errors) == 2
+
+def test_swap_keeps_keys_of_excluded_players():
+    players = roster("Player 1", "Caster Bob", "Player 3")
+    assert swap_keys(players, ["1", "2", "q"], "standard") == ["6", "2", "q"]
+
+def test_staged_swap_warns_about_a_shared_key():
+    players = roster("Player 1", "Player 2")
+    staged = stage_halftime_swap(players, ["1", "6"], "standard")
+    assert staged.swapped_keys == ["6", "1"]
+    assert staged.bind_map == {"6": 1, "1": 2}
+    assert staged.warnings == []
+
+    staged = stage_halftime_swap(players, ["1", "q"], {"1": "q"})
+    assert staged.swapped_keys == ["q", "q"]
+    assert staged.warnings
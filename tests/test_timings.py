@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from fake_netcon import FakeNetconServer
+from observer_binds import JsonLinesSink, NetconPool, PhaseTimings, fetch_players_async, percentile, timings
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+def test_percentile_picks_the_nearest_sample():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(range(101), 0.95) == 95
+    assert percentile([5], 0.99) == 5
+
+def test_operation_labels_nested_measurements_and_window_is_rolling():
+    phase_timings = PhaseTimings(window=3)
+    with phase_timings.operation("send"):
+        with phase_timings.operation("refresh"):
+            for seconds in (0.001, 0.002, 0.003, 0.004):
+                phase_timings.record("write", seconds, host="a")
+        with phase_timings.operation("probe", override=True):
+            phase_timings.record("read", 0.01, host="a")
+    phase_timings.record("save", 0.005)
+
+    summary = phase_timings.summary()
+    assert list(summary) == [("other", "save"), ("probe", "read"), ("send", "write")]
+    assert summary[("send", "write")]["count"] == 3
+    assert summary[("send", "write")]["max_ms"] == 4.0
+    assert ("send", "write", "a") in phase_timings.summary(by_host=True)
+
+def test_failed_measurements_are_recorded_as_not_ok():
+    phase_timings = PhaseTimings()
+    records = []
+    sink = records.append
+    phase_timings.add_sink(sink)
+    try:
+        with phase_timings.measure("connect", "a", "send"):
+            raise ConnectionRefusedError
+    except ConnectionRefusedError:
+        pass
+    phase_timings.remove_sink(sink)
+    phase_timings.record("connect", 0.1)
+    assert [(record["phase"], record["ok"]) for record in records] == [("connect", False)]
+
+def test_sink_leaves_out_excluded_operations(tmp_path):
+    path = tmp_path / "timings.jsonl"
+    sink = JsonLinesSink(str(path), exclude_operations=("probe",))
+    phase_timings = PhaseTimings()
+    phase_timings.add_sink(sink)
+    phase_timings.record("read", 0.01, "a", "probe")
+    phase_timings.record("read", 0.02, "a", "refresh")
+    sink.close()
+    assert [(record["operation"], record["ms"]) for record in read_records(path)] == [("refresh", 20.0)]
+
+def test_sink_rotates_into_one_old_file(tmp_path):
+    path = tmp_path / "timings.jsonl"
+    sink = JsonLinesSink(str(path), max_bytes=1000)
+    phase_timings = PhaseTimings()
+    phase_timings.add_sink(sink)
+    for index in range(100):
+        phase_timings.record("write", index / 1000, "a", "send")
+    sink.close()
+
+    old_file = tmp_path / "timings.jsonl.1"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["timings.jsonl", "timings.jsonl.1"]
+    assert path.stat().st_size <= 1000 and old_file.stat().st_size <= 1000
+    # Only the newest records are kept, in order
+    kept = [record["ms"] for record in read_records(old_file) + read_records(path)]
+    assert kept == sorted(kept) and kept[-1] == 99.0
+
+def test_sink_appends_to_an_existing_file(tmp_path):
+    path = tmp_path / "timings.jsonl"
+    path.write_text(json.dumps({"operation": "old"}) + "\n")
+    sink = JsonLinesSink(str(path))
+    sink({"operation": "new"})
+    sink.close()
+    assert [record["operation"] for record in read_records(path)] == ["old", "new"]
+
+def test_fetch_records_its_phases_per_host():
+    records = []
+    sink = records.append
+
+    async def run():
+        async with FakeNetconServer(roster_size=3) as server:
+            pool = NetconPool(timeout=2)
+            timings.add_sink(sink)
+            try:
+                with timings.operation("refresh"):
+                    await fetch_players_async(server.host, server.port, pool)
+            finally:
+                timings.remove_sink(sink)
+                await pool.close_all()
+
+    asyncio.run(run())
+    phases = {record["phase"] for record in records if record["operation"] == "refresh"}
+    assert {"connect", "write", "drain", "read", "parse"} <= phases
+    assert all(record["host"] == "127.0.0.1" for record in records if record["phase"] != "parse")